@@ -3,6 +3,12 @@ ASGI config for foodie_haven project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live event stream (/api/events/) is only served through this entry point,
+run as the Procfile's ``events`` process (``uvicorn foodie_haven.asgi:application``)
+next to the gunicorn ``web`` process. Either route /api/events/ to it at the
+proxy, or set EVENTS_URL to its public URL and the WSGI app redirects there;
+long-lived streams never pin gunicorn sync workers.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -1,7 +1,56 @@
 import os
 from celery import Celery
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodie_haven.settings')
 app = Celery('foodie_haven')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+# Queue topology. Purchase receipts get their own queue and worker (see
+# Procfile) so a newsletter or recipe-notification burst can never sit in
+# front of them; priorities only order work *within* a queue.
+#   transactional - mail a customer is waiting for
+#   celery        - default queue: payment reconciliation, the outbox relay
+#                   backstop and anything unrouted
+#   bulk          - newsletter and recipe notifications, rate limited
+app.conf.task_queues = (
+    Queue('transactional'),
+    Queue('celery'),
+    Queue('bulk'),
+)
+app.conf.task_default_queue = 'celery'
+
+# On the Redis broker 0 is the highest priority
+app.conf.task_routes = {
+    'recipes.tasks.send_purchase_email': {'queue': 'transactional', 'priority': 0},
+    'recipes.tasks.reconcile_payments': {'queue': 'celery'},
+    'recipes.tasks.relay_outbox': {'queue': 'celery'},
+    'recipes.tasks.archive_orders': {'queue': 'celery'},
+    'recipes.tasks.rebuild_public_snapshot': {'queue': 'celery'},
+    'recipes.tasks.send_subscription_welcome_email': {'queue': 'bulk', 'priority': 3},
+    'recipes.tasks.notify_new_recipe': {'queue': 'bulk', 'priority': 6},
+    'recipes.tasks.notify_new_recipes_digest': {'queue': 'bulk', 'priority': 6},
+    'recipes.tasks.send_subscription_welcome_emails': {'queue': 'bulk', 'priority': 9},
+}
+app.conf.broker_transport_options = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': [0, 3, 6, 9],
+    'sep': ':',
+}
+
+# acks_late: a receipt or reconciliation run interrupted by a worker crash is
+# redelivered instead of lost. rate_limit (per worker instance, shared by its
+# processes) keeps bulk mail under the SMTP provider's sending limits.
+app.conf.task_annotations = {
+    'recipes.tasks.send_purchase_email': {'acks_late': True, 'reject_on_worker_lost': True},
+    'recipes.tasks.reconcile_payments': {'acks_late': True, 'reject_on_worker_lost': True},
+    'recipes.tasks.send_subscription_welcome_email': {'rate_limit': '60/m'},
+    'recipes.tasks.notify_new_recipe': {'rate_limit': '60/m'},
+    'recipes.tasks.notify_new_recipes_digest': {'rate_limit': '60/m'},
+    'recipes.tasks.send_subscription_welcome_emails': {'rate_limit': '6/m'},
+}
+
+# Reserve one task at a time: long bulk batches are not hoarded by one busy
+# process, and late-acked tasks are not held unacknowledged in a prefetch buffer.
+app.conf.worker_prefetch_multiplier = 1
@@ -29,6 +29,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "recipes.middleware.CompressionMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # For static files in production
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -36,6 +37,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "recipes.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "foodie_haven.urls"
@@ -105,17 +107,48 @@ CORS_ALLOW_CREDENTIALS = True
 
 # DRF
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipes.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'recipes.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
-    ]
+        'recipes.authentication.StatelessJWTAuthentication'
+    ],
+    # Only views that set throttle_scope are throttled
+    'DEFAULT_THROTTLE_CLASSES': [
+        'recipes.throttling.SlidingWindowScopedThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'register': '10/hour',
+        'login': '10/min',
+        'subscribe': '5/hour',
+        'payment': '20/hour',
+    },
 }
 
+RECIPE_BULK_MAX_ITEMS = 500
+
+# RELATED RECIPES (recipes.recommendations)
+RELATED_RECIPES_TOP_K = 8
+RELATED_RECIPES_COPURCHASE_WEIGHT = 0.3  # share of the score from co-purchases; the rest is text similarity
+
+# RESPONSE COMPRESSION (recipes.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies are not worth compressing
+COMPRESSION_BROTLI_QUALITY = 5  # 0-11; 11 is far too slow to run per request
+
 # JWT
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Rotated tokens are blacklisted in the cache rather than the token_blacklist tables
+    'TOKEN_REFRESH_SERIALIZER': 'recipes.serializers.CacheBlacklistTokenRefreshSerializer',
 }
 
 # CACHES (Redis)
@@ -129,11 +162,58 @@ SIMPLE_JWT = {
 #     }
 # }
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Idempotency keys, locks and throttles only work across gunicorn workers with
+# a shared cache, so use Redis whenever REDIS_URL is configured.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+            }
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# STARTUP
+# Checked by `manage.py profile_startup --check`: total import time of a cold
+# worker, and modules that must stay lazily imported (the razorpay SDK drags
+# in pkg_resources, ~120 ms).
+STARTUP_IMPORT_BUDGET_MS = {
+    'web': 1200,
+    'celery': 1200,
 }
+STARTUP_DEFERRED_MODULES = ['razorpay', 'pkg_resources', 'numpy', 'scipy']
+
+# PROFILING (recipes.profiling)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False") == "True"  # opt in per environment; off removes the middleware
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_FILES = 50  # older captures are deleted as new ones are written
+PROFILING_STATS_LINES = 60  # functions shown in the admin summary of a capture
+
+# ADMIN
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100000  # below this, changelists count rows exactly (PostgreSQL)
+
+# LIVE EVENTS (SSE)
+EVENTS_REDIS_URL = os.getenv("EVENTS_REDIS_URL", os.getenv("REDIS_URL", ""))  # empty: in-process broker
+# Public URL of the `events` process (uvicorn, see Procfile). The WSGI web
+# process redirects /api/events/ there; without it, it answers 503. The two
+# processes only share events through Redis, so set EVENTS_REDIS_URL too.
+EVENTS_URL = os.getenv("EVENTS_URL", "")
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_RETRY_MS = 3000
+EVENTS_QUEUE_SIZE = 100  # undelivered events kept per connection
+
+# IDEMPOTENCY
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24  # how long a stored response can be replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 30  # upper bound on how long a request holds its key
+IDEMPOTENCY_WAIT_TIMEOUT = 10  # how long a duplicate waits for the first response
 
 
 # CELERY
@@ -141,6 +221,41 @@ CELERY_RESULT_BACKEND = 'redis://127.0.0.1:6379/0'
 CELERY_BROKER_URL = 'redis://127.0.0.1:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-payments': {
+        'task': 'recipes.tasks.reconcile_payments',
+        'schedule': timedelta(minutes=10),
+    },
+    'rebuild-related-recipes': {
+        'task': 'recipes.tasks.rebuild_related_recipes',
+        'schedule': timedelta(hours=24),
+    },
+    # Signals keep the snapshot current; this repairs rows changed by queryset.update()
+    'rebuild-public-snapshot': {
+        'task': 'recipes.tasks.rebuild_public_snapshot',
+        'schedule': timedelta(hours=1),
+    },
+    'archive-orders': {
+        'task': 'recipes.tasks.archive_orders',
+        'schedule': timedelta(hours=24),
+    },
+    # Backstop for the relay_outbox process; a run nobody picked up is dropped
+    'relay-outbox': {
+        'task': 'recipes.tasks.relay_outbox',
+        'schedule': timedelta(seconds=30),
+        'options': {'expires': 30},
+    },
+}
+
+# ORDER ARCHIVE (recipes.archive)
+ORDER_ARCHIVE_AFTER_DAYS = 365  # settled orders older than this move to OrderArchive
+ORDER_ARCHIVE_BATCH_SIZE = 1000  # orders moved per transaction
+ORDER_ARCHIVE_MAX_BATCHES = 100  # per run, so one run is bounded; the rest waits for the next
+
+# OUTBOX (recipes.outbox)
+OUTBOX_BATCH_SIZE = 100  # messages published per broker connection
+OUTBOX_LEASE_SECONDS = 60  # a claimed message is retried after this if the relay dies
+OUTBOX_POLL_INTERVAL = 1.0  # seconds the relay_outbox command sleeps when the outbox is empty
 
 # EMAIL
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -150,7 +265,16 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "")
 EMAIL_USE_LOCALTIME = True
+WELCOME_EMAIL_BATCH_SIZE = 100  # recipients per welcome-mail task in bulk imports
 
 # RAZORPAY
 RAZOR_KEY_ID = os.getenv("RAZOR_KEY_ID", "")
 RAZOR_KEY_SECRET = os.getenv("RAZOR_KEY_SECRET", "")
+RAZOR_API_BASE_URL = os.getenv("RAZOR_API_BASE_URL", "https://api.razorpay.com")
+RAZOR_CONNECT_TIMEOUT = float(os.getenv("RAZOR_CONNECT_TIMEOUT", "2"))
+RAZOR_READ_TIMEOUT = float(os.getenv("RAZOR_READ_TIMEOUT", "5"))
+RAZOR_MAX_RETRIES = int(os.getenv("RAZOR_MAX_RETRIES", "2"))
+RAZOR_RETRY_BACKOFF = 0.2  # seconds, doubled on each retry
+RAZOR_POOL_SIZE = 10
+RAZOR_BREAKER_THRESHOLD = 5  # consecutive failed calls before the breaker opens
+RAZOR_BREAKER_RESET_SECONDS = 30
@@ -18,8 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from recipes import profiling
 
 urlpatterns = [
+    path("admin/profiles/", admin.site.admin_view(profiling.profile_list_view), name="admin-profiles"),
+    path("admin/profiles/<str:name>/", admin.site.admin_view(profiling.profile_stats_view), name="admin-profile-stats"),
+    path("admin/profiles/<str:name>/download/", admin.site.admin_view(profiling.profile_download_view), name="admin-profile-download"),
     path("admin/", admin.site.urls),
     path('api/', include('recipes.urls'))
 ]
@@ -0,0 +1,32 @@
+"""
+Gunicorn settings (picked up automatically from the working directory).
+
+The app is imported once in the master and shared copy-on-write with the
+workers, so forking a new worker does not repeat Django's import and setup
+work. The master never keeps a database connection open across a fork:
+each worker connects on its first query.
+"""
+preload_app = True
+
+
+def when_ready(server):
+    # Load the URLconf (and with it every view and serializer module) in the
+    # master too, so workers do not import them on their first request
+    from django.db import connections
+    from django.urls import get_resolver
+
+    get_resolver().url_patterns
+    connections.close_all()
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
+
+
+def post_fork(server, worker):
+    from recipes import payments
+
+    # Start with a fresh HTTP pool rather than one inherited from the master
+    payments.reset_client()
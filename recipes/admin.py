@@ -1,21 +1,182 @@
+from django.conf import settings
 from django.contrib import admin
-from .models import Category, Recipe, Subscription, PurchasedRecipe, Order, CartItem
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from .models import Category, Recipe, RecipeContent, Subscription, PurchasedRecipe, Order, OrderArchive, CartItem
+from .views import invalidate_recipe_lists
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    On PostgreSQL an unfiltered changelist takes its row count from the
+    planner statistics instead of running COUNT(*) over the whole table.
+    Filtered lists, small tables and other databases still count exactly.
+    """
+
+    def is_unfiltered(self):
+        # Unfiltered means no WHERE beyond the default manager's own, e.g.
+        # Recipe.objects hiding tombstones. reltuples counts those too; an
+        # estimate can afford that.
+        where = self.object_list.query.where
+        return not where or where == self.object_list.model._default_manager.all().query.where
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and self.is_unfiltered():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return row[0]
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class UserLinkFilter(admin.SimpleListFilter):
+    """
+    Filter by a single user without listing every user in the sidebar.
+    The changelist links each row's user to `?<parameter_name>=<id>`, and
+    the sidebar only shows the user currently filtered on.
+    """
+    title = 'user'
+    parameter_name = 'user'
+    field = 'user'
+
+    def lookups(self, request, model_admin):
+        value = self.value()
+        if not value or not value.isdigit():
+            return []
+        username = User.objects.filter(pk=value).values_list('username', flat=True).first()
+        return [(value, username or value)]
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(**{f'{self.field}_id': value})
+        return queryset
+
+
+class CreatorFilter(UserLinkFilter):
+    title = 'created by'
+    parameter_name = 'created_by'
+    field = 'created_by'
+
+
+def user_filter_link(model, parameter_name, user):
+    url = reverse(f'admin:recipes_{model._meta.model_name}_changelist')
+    return format_html('<a href="{}?{}={}">{}</a>', url, parameter_name, user.pk, user.username)
+
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['id', 'name']
+    search_fields = ['name']
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(LargeTableAdmin):
     list_display = ['email', 'subscribed_at']
-    
-admin.site.register(PurchasedRecipe)
-admin.site.register(Order)
-admin.site.register(CartItem)
+    search_fields = ['email']
+
+
+@admin.register(PurchasedRecipe)
+class PurchasedRecipeAdmin(LargeTableAdmin):
+    list_display = ['id', 'user_link', 'recipe', 'payment_id', 'created_at']
+    list_select_related = ['user', 'recipe']
+    list_filter = [UserLinkFilter]
+    search_fields = ['=payment_id']
+    autocomplete_fields = ['user', 'recipe']
+
+    @admin.display(description='user', ordering='user')
+    def user_link(self, obj):
+        return user_filter_link(PurchasedRecipe, UserLinkFilter.parameter_name, obj.user)
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ['id', 'user_link', 'recipe', 'amount', 'status', 'created_at']
+    list_select_related = ['user', 'recipe']
+    list_filter = ['status', UserLinkFilter]
+    search_fields = ['=razorpay_order_id', '=payment_id']
+    autocomplete_fields = ['user', 'recipe']
+
+    @admin.display(description='user', ordering='user')
+    def user_link(self, obj):
+        return user_filter_link(Order, UserLinkFilter.parameter_name, obj.user)
+
+
+@admin.register(OrderArchive)
+class OrderArchiveAdmin(LargeTableAdmin):
+    list_display = ['id', 'user_link', 'recipe', 'amount', 'status', 'created_at', 'archived_at']
+    list_select_related = ['user', 'recipe']
+    list_filter = ['status', UserLinkFilter]
+    search_fields = ['=razorpay_order_id', '=payment_id']
+
+    @admin.display(description='user', ordering='user')
+    def user_link(self, obj):
+        return user_filter_link(OrderArchive, UserLinkFilter.parameter_name, obj.user)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CartItem)
+class CartItemAdmin(LargeTableAdmin):
+    list_display = ['id', 'user_link', 'recipe']
+    list_select_related = ['user', 'recipe']
+    list_filter = [UserLinkFilter]
+    autocomplete_fields = ['user', 'recipe']
+
+    @admin.display(description='user', ordering='user')
+    def user_link(self, obj):
+        return user_filter_link(CartItem, UserLinkFilter.parameter_name, obj.user)
+
+
+class RecipeContentInline(admin.StackedInline):
+    model = RecipeContent
+    can_delete = False
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = ['id', 'title', 'category', 'created_by', 'created_at']
-    list_filter = ['category', 'created_by']
-    search_fields = ['title', 'description']
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ['id', 'title', 'category', 'creator', 'created_at']
+    list_select_related = ['category', 'created_by']
+    list_filter = ['category', CreatorFilter]
+    # Title only: searching the description text meant an ILIKE over every row
+    search_fields = ['title']
+    autocomplete_fields = ['category', 'created_by']
+    inlines = [RecipeContentInline]
+
+    @admin.display(description='created by', ordering='created_by')
+    def creator(self, obj):
+        return user_filter_link(Recipe, CreatorFilter.parameter_name, obj.created_by)
+
+    # Deletes leave a tombstone, as the API does, so incremental sync clients
+    # learn about them and orders and purchases keep their recipe
+    def delete_model(self, request, obj):
+        obj.soft_delete()
+        invalidate_recipe_lists(obj.created_by_id)
+
+    def delete_queryset(self, request, queryset):
+        for recipe in queryset:
+            self.delete_model(request, recipe)
+
+    def get_deleted_objects(self, objs, request):
+        # Nothing cascades from a soft delete; list only the recipes themselves
+        objs = list(objs)
+        return [str(obj) for obj in objs], {Recipe._meta.verbose_name_plural: len(objs)}, set(), []
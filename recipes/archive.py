@@ -0,0 +1,81 @@
+"""
+Order archival.
+
+Settled (paid or failed) orders older than ORDER_ARCHIVE_AFTER_DAYS are
+moved from Order to OrderArchive in bounded batches. Each batch copies its
+rows and deletes them in one transaction. Pending orders stay put, since
+reconciliation still needs them; the ones it has given up on are settled
+against the gateway or expired first, so none stays pending for good.
+
+Reconciliation and the admin read only the small live table. The helpers
+below also read the archive, for callers that need the full history.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import payments
+from .models import Order, OrderArchive
+from .tasks import expire_stale_orders
+
+ORDER_FIELDS = ('id', 'user_id', 'recipe_id', 'payment_id', 'razorpay_order_id', 'amount', 'status', 'created_at')
+
+
+def _archive_batch(cutoff, batch_size):
+    with transaction.atomic():
+        orders = list(
+            Order.objects.filter(created_at__lt=cutoff)
+            .exclude(status=Order.STATUS_PENDING)
+            .select_for_update(skip_locked=True)
+            .order_by('created_at', 'pk')
+            .values(*ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0
+        # ignore_conflicts: a batch retried after a crash may already be copied
+        OrderArchive.objects.bulk_create([OrderArchive(**order) for order in orders], ignore_conflicts=True)
+        Order.objects.filter(pk__in=[order['id'] for order in orders]).delete()
+    return len(orders)
+
+
+def archive_orders(older_than_days=None, batch_size=None, max_batches=None):
+    """Move settled orders older than `older_than_days` to OrderArchive; returns how many moved."""
+    older_than_days = older_than_days or settings.ORDER_ARCHIVE_AFTER_DAYS
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    max_batches = max_batches or settings.ORDER_ARCHIVE_MAX_BATCHES
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    try:
+        print(f"⏳ {expire_stale_orders()}", flush=True)
+    except (payments.PaymentGatewayUnavailable, payments.PaymentGatewayError) as e:
+        print(f"⚠️ Stale pending orders not settled: {e}", flush=True)
+
+    moved = 0
+    for _ in range(max_batches):
+        count = _archive_batch(cutoff, batch_size)
+        moved += count
+        if count < batch_size:
+            break
+    return moved
+
+
+def order_history(full_history=False, **filters):
+    """
+    Orders matching `filters` as dicts of ORDER_FIELDS, newest first. Only
+    the live table is read unless `full_history` is set, in which case
+    archived orders are included with one UNION ALL query.
+    """
+    live = Order.objects.filter(**filters).values(*ORDER_FIELDS)
+    if not full_history:
+        return live.order_by('-created_at', '-id')
+    archived = OrderArchive.objects.filter(**filters).values(*ORDER_FIELDS)
+    return live.union(archived, all=True).order_by('-created_at', '-id')
+
+
+def has_ordered(user_id, recipe_id):
+    """Whether the user has a pending or paid order for the recipe, live or archived."""
+    return (
+        Order.objects.filter(user_id=user_id, recipe_id=recipe_id).exclude(status=Order.STATUS_FAILED).exists()
+        or OrderArchive.objects.filter(user_id=user_id, recipe_id=recipe_id).exclude(status=Order.STATUS_FAILED).exists()
+    )
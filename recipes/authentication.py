@@ -0,0 +1,45 @@
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import ClaimsUser
+
+# Claims added by CustomTokenObtainPairSerializer.get_token
+USER_CLAIMS = ('username', 'is_staff')
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token claims instead
+    of loading the User row on every request.
+
+    The user is a ClaimsUser with only id, username, is_staff and is_active
+    populated; anything else (email, password, ...) is loaded lazily the
+    first time a view touches it. Tokens issued before the claims existed
+    fall back to the regular database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or not all(claim in validated_token for claim in USER_CLAIMS):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        # Tokens are only issued to active users; deactivation takes effect
+        # when the access token expires.
+        values = {
+            api_settings.USER_ID_FIELD: user_id,
+            'username': validated_token['username'],
+            'is_staff': validated_token['is_staff'],
+            'is_active': True,
+        }
+        field_names = [f.attname for f in ClaimsUser._meta.concrete_fields if f.attname in values]
+        return ClaimsUser.from_db(
+            router.db_for_read(ClaimsUser),
+            field_names,
+            [values[name] for name in field_names],
+        )
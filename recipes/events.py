@@ -0,0 +1,162 @@
+"""
+Live events pushed to browsers over server-sent events (SSE).
+
+Sync views publish small JSON events (cart counts, newly public recipes) to
+a broker. Each ASGI worker keeps one upstream subscription per channel that
+has local listeners and fans every message out to per-connection asyncio
+queues, so thousands of idle streams cost one queue each rather than one
+Redis connection each.
+
+With EVENTS_REDIS_URL unset an in-memory broker is used, which only
+delivers events published inside the same process (tests, local runs).
+"""
+import asyncio
+import json
+from collections import defaultdict
+
+from django.conf import settings
+
+PUBLIC_RECIPES_CHANNEL = 'recipes:public'
+
+
+def cart_channel(user_id):
+    return f'cart:{user_id}'
+
+
+class EventHub:
+    """Fans messages out to the local listeners of each channel."""
+
+    def __init__(self):
+        self._listeners = defaultdict(set)  # channel -> {(loop, queue)}
+
+    def add(self, channel, loop, queue):
+        first = not self._listeners[channel]
+        self._listeners[channel].add((loop, queue))
+        return first
+
+    def remove(self, channel, loop, queue):
+        listeners = self._listeners.get(channel)
+        if not listeners:
+            return False
+        listeners.discard((loop, queue))
+        if listeners:
+            return False
+        del self._listeners[channel]
+        return True
+
+    def dispatch(self, channel, message):
+        for loop, queue in list(self._listeners.get(channel, ())):
+            loop.call_soon_threadsafe(_offer, queue, message)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass  # the client is not reading; drop rather than buffer without bound
+
+
+class InMemoryBroker:
+    def __init__(self):
+        self.hub = EventHub()
+
+    def publish(self, channel, message):
+        self.hub.dispatch(channel, message)
+
+    async def subscribe(self, channel, queue):
+        self.hub.add(channel, asyncio.get_running_loop(), queue)
+
+    async def unsubscribe(self, channel, queue):
+        self.hub.remove(channel, asyncio.get_running_loop(), queue)
+
+
+class RedisBroker:
+    def __init__(self, url):
+        self.url = url
+        self.hub = EventHub()
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+
+    def publish(self, channel, message):
+        if self._client is None:
+            import redis
+            self._client = redis.Redis.from_url(self.url)
+        self._client.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel, queue):
+        if self._pubsub is None:
+            import redis.asyncio
+            self._pubsub = redis.asyncio.Redis.from_url(self.url).pubsub()
+        if self.hub.add(channel, asyncio.get_running_loop(), queue):
+            await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel, queue):
+        if self.hub.remove(channel, asyncio.get_running_loop(), queue):
+            await self._pubsub.unsubscribe(channel)
+
+    async def _read(self):
+        from redis.exceptions import ConnectionError as RedisConnectionError
+
+        while True:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except (RedisConnectionError, OSError) as e:
+                # redis-py reconnects and resubscribes on the next call
+                print(f"⚠️ Event stream lost Redis connection: {e}", flush=True)
+                await asyncio.sleep(1)
+                continue
+            if message is None or message['type'] != 'message':
+                continue
+            channel = message['channel'].decode()
+            self.hub.dispatch(channel, json.loads(message['data']))
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        url = settings.EVENTS_REDIS_URL
+        _broker = RedisBroker(url) if url else InMemoryBroker()
+    return _broker
+
+
+def publish(channel, event, data):
+    """Publish from sync code; never lets a broker outage fail the request."""
+    try:
+        get_broker().publish(channel, {'event': event, 'data': data})
+    except Exception as e:
+        print(f"⚠️ Failed to publish {event} event: {e}", flush=True)
+
+
+def publish_cart_count(user_id, count):
+    publish(cart_channel(user_id), 'cart_count', {'count': count})
+
+
+def publish_public_recipes(recipe_ids):
+    for recipe_id in recipe_ids:
+        publish(PUBLIC_RECIPES_CHANNEL, 'public_recipe', {'id': recipe_id})
+
+
+async def stream(channels):
+    """Async iterator of SSE frames for the given channels."""
+    broker = get_broker()
+    queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+    for channel in channels:
+        await broker.subscribe(channel, queue)
+    try:
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"event: {message['event']}\ndata: {json.dumps(message['data'])}\n\n"
+    finally:
+        for channel in channels:
+            await broker.unsubscribe(channel, queue)
@@ -0,0 +1,124 @@
+"""
+Range filters and facet counts for the recipe list.
+
+Filters come from `?min_<field>=` / `?max_<field>=` query parameters. Facet
+counts for every bucket of every field are computed by one aggregate query
+of conditional COUNTs. Each facet is counted with all the *other* range
+filters applied but not its own, so a client can show how many recipes it
+would get by switching to another bucket of that facet.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+RANGE_FIELDS = {
+    'price': Decimal,
+    'preparation_time': int,
+    'cooking_time': int,
+    'rating': Decimal,
+}
+
+# (key, min inclusive, max exclusive); None leaves that side open
+FACET_BUCKETS = {
+    'price': [
+        ('0-100', None, 100),
+        ('100-250', 100, 250),
+        ('250-500', 250, 500),
+        ('500+', 500, None),
+    ],
+    'preparation_time': [
+        ('0-15', None, 15),
+        ('15-30', 15, 30),
+        ('30-60', 30, 60),
+        ('60+', 60, None),
+    ],
+    'cooking_time': [
+        ('0-15', None, 15),
+        ('15-30', 15, 30),
+        ('30-60', 30, 60),
+        ('60+', 60, None),
+    ],
+    'rating': [
+        ('0-3', None, 3),
+        ('3-4', 3, 4),
+        ('4+', 4, None),
+    ],
+}
+
+
+def _parse_value(field, name, raw):
+    try:
+        value = RANGE_FIELDS[field](raw)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValidationError({name: 'Must be a number.'})
+    if isinstance(value, Decimal) and not value.is_finite():
+        raise ValidationError({name: 'Must be a number.'})
+    return value
+
+
+def parse_range_filters(params):
+    """Return {field: (min, max)} for the range parameters present in `params`."""
+    ranges = {}
+    for field in RANGE_FIELDS:
+        bounds = []
+        for side in ('min', 'max'):
+            name = f'{side}_{field}'
+            raw = params.get(name, '').strip()
+            bounds.append(_parse_value(field, name, raw) if raw else None)
+        if bounds != [None, None]:
+            ranges[field] = tuple(bounds)
+    return ranges
+
+
+def range_q(field, low, high, high_inclusive=True):
+    q = Q()
+    if low is not None:
+        q &= Q(**{f'{field}__gte': low})
+    if high is not None:
+        q &= Q(**{f'{field}__lte' if high_inclusive else f'{field}__lt': high})
+    return q
+
+
+def apply_range_filters(queryset, ranges):
+    for field, (low, high) in ranges.items():
+        queryset = queryset.filter(range_q(field, low, high))
+    return queryset
+
+
+def cache_key_part(ranges):
+    """A stable string for `ranges`, for use in cache keys."""
+    return '_'.join(f'{field}_{low}_{high}' for field, (low, high) in sorted(ranges.items())) or 'none'
+
+
+def facet_counts(queryset, ranges):
+    """
+    Bucket counts for every facet plus the filtered total, in one query.
+
+    `queryset` must already be limited to the visible recipes and any
+    non-range filters (category, search), but not the range filters.
+    """
+    def filters_except(excluded):
+        q = Q()
+        for field, (low, high) in ranges.items():
+            if field != excluded:
+                q &= range_q(field, low, high)
+        return q
+
+    aggregates = {'total': Count('id', filter=filters_except(None))}
+    for field, buckets in FACET_BUCKETS.items():
+        others = filters_except(field)
+        for i, (_, low, high) in enumerate(buckets):
+            aggregates[f'{field}__{i}'] = Count('id', filter=others & range_q(field, low, high, high_inclusive=False))
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'facets': {
+            field: [
+                {'key': key, 'min': low, 'max': high, 'count': counts[f'{field}__{i}']}
+                for i, (key, low, high) in enumerate(buckets)
+            ]
+            for field, buckets in FACET_BUCKETS.items()
+        },
+    }
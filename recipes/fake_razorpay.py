@@ -0,0 +1,159 @@
+"""
+A small in-process stand-in for the Razorpay REST API.
+
+It implements just the endpoints the payment code uses, so the payment flow
+can be exercised and benchmarked without network access. Point
+RAZOR_API_BASE_URL at `server.base_url` to use it.
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeRazorpayServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.fail_next = 0  # number of upcoming requests to answer with a 500
+        self.orders = {}
+        self.payments = {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def pay(self, order_id, status='captured', amount=None):
+        """Simulate a customer paying `order_id`; returns the payment id."""
+        with self._lock:
+            order = self.orders[order_id]
+            payment_id = f'pay_{uuid.uuid4().hex[:14]}'
+            self.payments[payment_id] = {
+                'id': payment_id,
+                'entity': 'payment',
+                'order_id': order_id,
+                'amount': order['amount'] if amount is None else amount,
+                'currency': order['currency'],
+                'status': status,
+                'created_at': int(time.time()),
+            }
+            if status == 'captured':
+                order['status'] = 'paid'
+        return payment_id
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _dispatch(self, method):
+                with server._lock:
+                    server.request_count += 1
+                    failing = server.fail_next > 0
+                    if failing:
+                        server.fail_next -= 1
+                if server.latency:
+                    time.sleep(server.latency)
+                if failing:
+                    return self._send(500, {'error': {'code': 'SERVER_ERROR', 'description': 'Injected failure'}})
+
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                body = {}
+                if method == 'POST':
+                    length = int(self.headers.get('Content-Length') or 0)
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                status, response = server.handle(method, url.path, query, body)
+                self._send(status, response)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+        return Handler
+
+    def handle(self, method, path, query, body):
+        with self._lock:
+            if method == 'POST' and path == '/v1/orders':
+                order_id = f'order_{uuid.uuid4().hex[:14]}'
+                order = {
+                    'id': order_id,
+                    'entity': 'order',
+                    'amount': body.get('amount'),
+                    'currency': body.get('currency', 'INR'),
+                    'receipt': body.get('receipt'),
+                    'notes': body.get('notes', {}),
+                    'status': 'created',
+                    'created_at': int(time.time()),
+                }
+                self.orders[order_id] = order
+                return 200, order
+
+            if method == 'GET' and path == '/v1/orders':
+                items = list(self.orders.values())
+                if 'receipt' in query:
+                    items = [o for o in items if o['receipt'] == query['receipt']]
+                return 200, {'entity': 'collection', 'count': len(items), 'items': items}
+
+            match = re.fullmatch(r'/v1/orders/(\w+)', path)
+            if method == 'GET' and match:
+                order = self.orders.get(match.group(1))
+                if order is None:
+                    return 400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Order not found'}}
+                return 200, order
+
+            if method == 'GET' and path == '/v1/payments':
+                since = int(query.get('from', 0))
+                until = int(query.get('to', 2 ** 31))
+                count = int(query.get('count', 10))
+                skip = int(query.get('skip', 0))
+                items = [p for p in self.payments.values() if since <= p['created_at'] <= until]
+                items = items[skip:skip + count]
+                return 200, {'entity': 'collection', 'count': len(items), 'items': items}
+
+            match = re.fullmatch(r'/v1/payments/(\w+)', path)
+            if method == 'GET' and match:
+                payment = self.payments.get(match.group(1))
+                if payment is None:
+                    return 400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Payment not found'}}
+                return 200, payment
+
+        return 400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': f'Unsupported {method} {path}'}}
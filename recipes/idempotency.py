@@ -0,0 +1,80 @@
+"""
+`Idempotency-Key` support for endpoints that must not run twice.
+
+The first response for a (user, path, key) is stored in the cache. Replays
+are answered from the cache without touching the database, and a duplicate
+that arrives while the first request is still running waits on a cache lock
+instead of executing again.
+"""
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def _cache_keys(request, key):
+    digest = hashlib.sha256(f'{request.user.pk}:{request.path}:{key}'.encode()).hexdigest()
+    return f'idem_response_{digest}', f'idem_lock_{digest}'
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response({'error': 'Idempotency-Key was already used with a different request body'}, status=422)
+    return Response(stored['data'], status=stored['status'], headers={'Idempotent-Replayed': 'true'})
+
+
+def idempotent(view_method):
+    """
+    Decorate an APIView handler (e.g. `create`) so requests carrying an
+    `Idempotency-Key` header execute at most once per key.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+
+        response_key, lock_key = _cache_keys(request, key)
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(response_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        if not cache.add(lock_key, 1, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            # Another request with this key is in flight: wait for its result
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                stored = cache.get(response_key)
+                if stored is not None:
+                    return _replay(stored, fingerprint)
+                if cache.get(lock_key) is None:
+                    break  # the first request failed without storing a result
+            return Response({'error': 'A request with this Idempotency-Key is still in progress'}, status=409)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            # Server errors are not stored so the client can retry them
+            if response.status_code < 500:
+                cache.set(response_key, {
+                    'status': response.status_code,
+                    'data': response.data,
+                    'fingerprint': fingerprint,
+                }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,160 @@
+"""
+Chunked maintenance jobs run in parallel by the `run_job` command.
+
+A job is a function `(start_pk, end_pk) -> rows changed` registered with
+`@register(name, model)`. The command splits the model's primary key range
+into half-open chunks and runs them across a process pool. Jobs must be
+idempotent: after a crash the run resumes from the last checkpoint, so a
+few chunks past it may be processed twice.
+"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable
+
+import django
+from django.db import connections, transaction
+from django.db.models import Max, Min
+
+from .models import ChangeSequence, JobCheckpoint, Recipe, RecipeContent
+
+JOBS = {}
+
+
+@dataclass(frozen=True)
+class Job:
+    name: str
+    model: type
+    func: Callable[[int, int], int]
+
+
+def register(name, model):
+    def decorator(func):
+        JOBS[name] = Job(name, model, func)
+        return func
+    return decorator
+
+
+def chunk_ranges(first, last, size):
+    """Half-open [start, end) ranges covering primary keys first..last."""
+    for start in range(first, last + 1, size):
+        yield start, min(start + size, last + 1)
+
+
+def _init_worker():
+    django.setup()
+    # Chunks write from several processes at once. On SQLite, a worker takes
+    # the write lock when its transaction starts, so the others wait for it
+    # instead of failing mid-transaction; other processes keep the default.
+    connection = connections['default']
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+
+def _run_chunk(name, start, end):
+    return start, end, JOBS[name].func(start, end)
+
+
+def run(name, workers, chunk_size, restart=False, report=print):
+    """
+    Run job `name` over every chunk after its checkpoint.
+
+    `report` is called with a progress line after each chunk. Returns
+    (rows changed, seconds taken).
+    """
+    job = JOBS[name]
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=name)
+    if restart:
+        checkpoint.last_pk = 0
+        checkpoint.save()
+
+    bounds = job.model._base_manager.filter(pk__gt=checkpoint.last_pk).aggregate(first=Min('pk'), last=Max('pk'))
+    if bounds['first'] is None:
+        report(f"Nothing to do after pk {checkpoint.last_pk}")
+        return 0, 0.0
+
+    chunks = list(chunk_ranges(bounds['first'], bounds['last'], chunk_size))
+    done_ends = {}
+    next_chunk = 0  # index of the first chunk not yet folded into the checkpoint
+    changed = 0
+    started = time.monotonic()
+
+    # Workers are spawned, not forked, so none of them inherits this
+    # process's DB connection; each opens its own after django.setup().
+    connections.close_all()
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = set()
+        queued = iter(chunks)
+        for start, end in queued:
+            pending.add(pool.submit(_run_chunk, name, start, end))
+            if len(pending) >= workers * 4:
+                break
+
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            error = None
+            for future in finished:
+                try:
+                    start, end, rows = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                changed += rows
+                done_ends[start] = end
+            if error is None:
+                for start, end in queued:
+                    pending.add(pool.submit(_run_chunk, name, start, end))
+                    if len(pending) >= workers * 4:
+                        break
+
+            # Chunks finish out of order; only checkpoint the contiguous prefix
+            advanced = False
+            while next_chunk < len(chunks) and chunks[next_chunk][0] in done_ends:
+                checkpoint.last_pk = done_ends.pop(chunks[next_chunk][0]) - 1
+                next_chunk += 1
+                advanced = True
+            if advanced:
+                checkpoint.save(update_fields=['last_pk', 'updated_at'])
+            if error is not None:
+                for future in pending:
+                    future.cancel()
+                raise error
+
+            elapsed = max(time.monotonic() - started, 1e-6)
+            completed = next_chunk + len(done_ends)
+            report(
+                f"{completed}/{len(chunks)} chunks, {changed} rows changed, "
+                f"{completed * chunk_size / elapsed:.0f} pks/s, checkpoint at pk {checkpoint.last_pk}"
+            )
+
+    return changed, time.monotonic() - started
+
+
+@register('backfill_recipe_content', Recipe)
+def backfill_recipe_content(start, end):
+    """Give every recipe a RecipeContent row."""
+    ids = list(
+        Recipe.all_objects.filter(pk__gte=start, pk__lt=end, content__isnull=True).values_list('pk', flat=True)
+    )
+    RecipeContent.objects.bulk_create(
+        [RecipeContent(recipe_id=pk, description='') for pk in ids], ignore_conflicts=True
+    )
+    return len(ids)
+
+
+@register('backfill_change_seq', Recipe)
+def backfill_change_seq(start, end):
+    """Move recipes loaded without save() (e.g. loaddata) onto the change feed."""
+    with transaction.atomic():
+        ids = list(
+            Recipe.all_objects.filter(pk__gte=start, pk__lt=end, change_seq=0).order_by('pk').values_list('pk', flat=True)
+        )
+        if not ids:
+            return 0
+        first = ChangeSequence.allocate(Recipe.CHANGE_SEQUENCE, len(ids))
+        Recipe.all_objects.bulk_update(
+            [Recipe(pk=pk, change_seq=first + i) for i, pk in enumerate(ids)], ['change_seq']
+        )
+    return len(ids)
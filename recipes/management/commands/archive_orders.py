@@ -0,0 +1,22 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = 'Move settled orders older than the cutoff from Order to OrderArchive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=settings.ORDER_ARCHIVE_MAX_BATCHES)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        moved = archive_orders(options['older_than_days'], options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} orders in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,93 @@
+import io
+import json
+import random
+import timeit
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from recipes.middleware import brotli
+from recipes.models import Category, Recipe, RecipeContent
+from recipes.renderers import ORJSONParser, ORJSONRenderer
+from recipes.serializers import RecipeDetailSerializer
+
+WORDS = (
+    'stir simmer onion garlic butter salt pepper cumin tomato paste fry until golden add water '
+    'cover cook minutes rice lentils ginger chilli coriander serve hot knead dough rest bake oven'
+).split()
+
+
+def sample_page(size, seed=0):
+    """A LimitOffsetPagination-shaped page of `size` recipes with full text, built without the database."""
+    rng = random.Random(seed)
+    category = Category(id=1, name='Main course')
+    user = User(id=1, username='chef')
+    now = timezone.now()
+    recipes = []
+    for i in range(1, size + 1):
+        recipe = Recipe(
+            id=i, title=f'Recipe {i}', image=f'https://example.com/images/{i}.jpg',
+            category=category, created_by=user, preparation_time=rng.randint(5, 40),
+            cooking_time=rng.randint(10, 90), rating=Decimal(rng.randint(30, 50)) / 10,
+            price=Decimal(rng.randint(5000, 50000)) / 100, is_public=True,
+            created_at=now, updated_at=now, change_seq=i,
+        )
+        recipe.content = RecipeContent(
+            description=' '.join(rng.choices(WORDS, k=100)),
+            process='\n'.join(' '.join(rng.choices(WORDS, k=25)) for _ in range(10)),
+        )
+        recipes.append(recipe)
+    return {
+        'count': 1000,
+        'next': f'https://example.com/api/recipes/?limit={size}&offset={size}',
+        'previous': None,
+        'results': RecipeDetailSerializer(recipes, many=True).data,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON render/parse time and bytes on the wire for a page of recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=20, help='Recipes per page')
+        parser.add_argument('--number', type=int, default=500, help='Iterations per measurement')
+
+    def handle(self, *args, **options):
+        data = sample_page(options['size'])
+        number = options['number']
+
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+        stock_body, fast_body = stock.render(data), fast.render(data)
+        if json.loads(stock_body) != json.loads(fast_body):
+            raise CommandError('ORJSONRenderer output differs from JSONRenderer')
+
+        def per_call(func):
+            return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+        rows = [
+            ('render JSONRenderer', per_call(lambda: stock.render(data))),
+            ('render ORJSONRenderer', per_call(lambda: fast.render(data))),
+            ('parse JSONParser', per_call(lambda: JSONParser().parse(io.BytesIO(stock_body)))),
+            ('parse ORJSONParser', per_call(lambda: ORJSONParser().parse(io.BytesIO(fast_body)))),
+        ]
+        self.stdout.write(f"{options['size']}-recipe page, {number} iterations:")
+        for label, micros in rows:
+            self.stdout.write(f"  {label:24} {micros:9.1f} us")
+
+        self.stdout.write('Bytes on the wire:')
+        self.stdout.write(f"  {'identity':24} {len(fast_body):9d}")
+        gzipped = compress_string(fast_body, max_random_bytes=100)
+        self.stdout.write(f"  {'gzip':24} {len(gzipped):9d}  ({per_call(lambda: compress_string(fast_body)):.1f} us)")
+        if brotli is not None:
+            quality = settings.COMPRESSION_BROTLI_QUALITY
+            compressed = brotli.compress(fast_body, quality=quality)
+            micros = per_call(lambda: brotli.compress(fast_body, quality=quality))
+            self.stdout.write(f"  {f'brotli (quality {quality})':24} {len(compressed):9d}  ({micros:.1f} us)")
+        else:
+            self.stdout.write('  brotli                   not installed')
@@ -0,0 +1,119 @@
+"""
+Time the recipe list queries against the narrow Recipe table and against
+the same rows with description and process inline, as Recipe was before
+RecipeContent.
+
+A synthetic catalogue is written inside a transaction that is rolled back
+afterwards. Both layouts are copied from it into unindexed temporary
+tables so they differ only in row width. Each query then runs against
+both tables. The inline layout also reads the text columns on the page
+query, as the list serializer used to.
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.management.commands.bench_json import WORDS
+from recipes.models import Category, Recipe, RecipeContent
+
+BATCH_SIZE = 1000
+PAGE_SIZE = 20
+
+
+def synthetic_catalogue(size, seed=0):
+    """Insert `size` recipes with full text; returns the average text bytes per recipe."""
+    rng = random.Random(seed)
+    category = Category.objects.create(name='Bench')
+    user = User.objects.create_user(f'bench-list-{rng.getrandbits(32):08x}')
+    text_bytes = 0
+    for start in range(0, size, BATCH_SIZE):
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                title=f'Recipe {n}', category=category, created_by=user, is_public=rng.random() < 0.8,
+                preparation_time=rng.randint(5, 40), cooking_time=rng.randint(10, 90),
+                rating=Decimal(rng.randint(30, 50)) / 10, price=Decimal(rng.randint(5000, 50000)) / 100,
+                change_seq=n,
+            )
+            for n in range(start, min(start + BATCH_SIZE, size))
+        ])
+        contents = [
+            RecipeContent(
+                recipe=recipe,
+                description=' '.join(rng.choices(WORDS, k=100)),
+                process='\n'.join(' '.join(rng.choices(WORDS, k=25)) for _ in range(10)),
+            )
+            for recipe in recipes
+        ]
+        text_bytes += sum(len(c.description) + len(c.process) for c in contents)
+        RecipeContent.objects.bulk_create(contents)
+    return text_bytes / size
+
+
+def list_queries(table, text_columns):
+    """(label, sql, params) of the list endpoint's queries against `table`."""
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(field.column) for field in Recipe._meta.concrete_fields) + text_columns
+    return [
+        ('count public', f'SELECT COUNT(*) FROM {table} WHERE {qn("is_public")} = %s', [True]),
+        ('page (offset 1000)', f'SELECT {columns} FROM {table} WHERE {qn("is_public")} = %s '
+                               f'ORDER BY {qn("id")} LIMIT {PAGE_SIZE} OFFSET 1000', [True]),
+        ('unindexed range count', f'SELECT COUNT(*) FROM {table} WHERE {qn("cooking_time")} BETWEEN %s AND %s '
+                                  f'AND {qn("price")} < %s', [30, 60, 200]),
+    ]
+
+
+def best_of(cursor, sql, params, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark recipe list queries with and without the text columns inline, on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=20000, help='Synthetic recipes')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the fastest is reported')
+
+    def handle(self, *args, **options):
+        if options['size'] < 1:
+            raise CommandError('--size must be at least 1')
+        qn = connection.ops.quote_name
+        recipe_table, content_table = qn(Recipe._meta.db_table), qn(RecipeContent._meta.db_table)
+        narrow, inline = qn('bench_recipe_narrow'), qn('bench_recipe_inline')
+        text_columns = f', {qn("description")}, {qn("process")}'
+
+        rows = []
+        with transaction.atomic():
+            text_bytes = synthetic_catalogue(options['size'])
+            with connection.cursor() as cursor:
+                cursor.execute(f'CREATE TEMPORARY TABLE {narrow} AS SELECT * FROM {recipe_table}')
+                cursor.execute(
+                    f'CREATE TEMPORARY TABLE {inline} AS SELECT r.*, c.{qn("description")}, c.{qn("process")} '
+                    f'FROM {recipe_table} r JOIN {content_table} c ON c.{qn("recipe_id")} = r.{qn("id")}'
+                )
+                for (label, after_sql, params), (_, before_sql, _) in zip(
+                    list_queries(narrow, ''), list_queries(inline, text_columns),
+                ):
+                    rows.append((
+                        label,
+                        best_of(cursor, before_sql, params, options['repeat']),
+                        best_of(cursor, after_sql, params, options['repeat']),
+                    ))
+                cursor.execute(f'DROP TABLE {narrow}')
+                cursor.execute(f'DROP TABLE {inline}')
+            # Leave the database as it was
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"{options['size']} recipes, {text_bytes:.0f} bytes of text each ({connection.vendor}):")
+        self.stdout.write(f"  {'query':24} {'inline text':>12} {'RecipeContent':>14}")
+        for label, before, after in rows:
+            self.stdout.write(f"  {label:24} {before:9.2f} ms {after:11.2f} ms  ({before / after:.1f}x)")
@@ -0,0 +1,95 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from recipes.views import CustomTokenObtainPairSerializer
+
+REPLAY_EVERY = 10  # every Nth refresh, also replay the token it rotated out
+
+
+def refresh(view, factory, token):
+    """POST one refresh; returns (status code, response data, seconds)."""
+    request = factory.post('/api/token/refresh', {'refresh': token}, format='json')
+    started = time.perf_counter()
+    response = view(request)
+    response.render()
+    return response.status_code, response.data, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Load-test the token refresh endpoint: concurrent clients rotating refresh tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--refreshes', type=int, default=250, help='Refreshes per client')
+
+    def handle(self, *args, **options):
+        clients, per_client = options['clients'], options['refreshes']
+        if clients < 1 or per_client < 1:
+            raise CommandError('--clients and --refreshes must be at least 1')
+
+        view, factory = TokenRefreshView.as_view(), APIRequestFactory()
+        user = User.objects.create_user(f'bench-refresh-{uuid.uuid4().hex[:8]}')
+        try:
+            token = str(CustomTokenObtainPairSerializer.get_token(user))
+            with CaptureQueriesContext(connection) as queries:
+                status, data, _ = refresh(view, factory, token)
+            if status != 200:
+                raise CommandError(f'Refresh failed with {status}: {data}')
+            writes = [q for q in queries if not q['sql'].lstrip().upper().startswith('SELECT')]
+
+            start = threading.Barrier(clients)
+            failures = []
+
+            def client():
+                current = str(CustomTokenObtainPairSerializer.get_token(user))
+                timings = []
+                start.wait()
+                try:
+                    for n in range(per_client):
+                        status, data, seconds = refresh(view, factory, current)
+                        if status != 200:
+                            failures.append(f'refresh returned {status}')
+                            break
+                        timings.append(seconds)
+                        if n % REPLAY_EVERY == 0 and refresh(view, factory, current)[0] != 401:
+                            failures.append('a rotated refresh token was accepted again')
+                        current = data['refresh']
+                finally:
+                    connection.close()
+                return timings
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                per_thread = list(pool.map(lambda _: client(), range(clients)))
+            elapsed = time.perf_counter() - started
+        finally:
+            user.delete()
+
+        timings = [t for thread in per_thread for t in thread]
+        if not timings:
+            raise CommandError(f"No refresh succeeded: {'; '.join(failures[:3])}")
+        ms = sorted(t * 1000 for t in timings)
+        replays = sum(len(range(0, len(thread), REPLAY_EVERY)) for thread in per_thread)
+
+        self.stdout.write(f"{len(timings)} refreshes from {clients} clients in {elapsed:.2f} s "
+                          f"({len(timings) / elapsed:.0f}/s, plus {replays} replayed tokens)")
+        self.stdout.write(f"  latency p50 {ms[len(ms) // 2]:.2f} ms  p95 {ms[int(len(ms) * 0.95)]:.2f} ms  "
+                          f"max {ms[-1]:.2f} ms")
+        # The blacklist grows by one jti per refresh; flat latency means lookups stay O(1)
+        first = statistics.mean(t * 1000 for thread in per_thread for t in thread[:max(len(thread) // 10, 1)])
+        last = statistics.mean(t * 1000 for thread in per_thread for t in thread[-max(len(thread) // 10, 1):])
+        self.stdout.write(f"  mean of each client's first 10% {first:.2f} ms, last 10% {last:.2f} ms "
+                          f"(blacklist grew by {len(timings)} jtis)")
+        self.stdout.write(f"  per refresh: {len(queries)} queries, {len(writes)} writes")
+        if failures:
+            raise CommandError(f"{len(failures)} failures: {'; '.join(failures[:3])}")
@@ -0,0 +1,101 @@
+import timeit
+import uuid
+from contextlib import ExitStack
+from unittest import mock
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import ScopedRateThrottle
+
+from recipes import throttling
+
+CACHE_METHODS = ('get', 'get_many', 'set', 'add', 'incr')
+
+
+class BenchView:
+    throttle_scope = None
+
+
+def counting_cache_calls():
+    """
+    Patch the default cache (and the Redis script, if any) to count the
+    calls a throttle makes; returns (stack, calls). Calls a backend makes to
+    itself, such as LocMemCache.get_many calling get, are not counted.
+    """
+    calls = []
+    depth = [0]
+    stack = ExitStack()
+
+    def counted(name, method):
+        def call(*args, **kwargs):
+            if not depth[0]:
+                calls.append(name)
+            depth[0] += 1
+            try:
+                return method(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        return call
+
+    backend = caches['default']
+    for name in CACHE_METHODS:
+        stack.enter_context(mock.patch.object(backend, name, counted(name, getattr(backend, name))))
+    script = throttling.counter._redis_script()
+    if script is not None:
+        stack.enter_context(mock.patch.object(throttling.counter, '_script', counted('script', script)))
+    return stack, calls
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the per-request cost of the sliding-window throttle against DRF ScopedRateThrottle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help='Throttled requests per measurement')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        if number < 1:
+            raise CommandError('--number must be at least 1')
+        scope = f'bench-{uuid.uuid4().hex[:8]}'
+        # High enough that nothing is rejected: this measures the check itself
+        rates = {scope: f'{number * 10}/hour'}
+
+        class SlidingWindow(throttling.SlidingWindowScopedThrottle):
+            THROTTLE_RATES = rates
+
+        class Stock(ScopedRateThrottle):
+            THROTTLE_RATES = rates
+
+        request = APIRequestFactory().post('/api/token/', REMOTE_ADDR='203.0.113.7')
+        request.user = None
+        unscoped, scoped = BenchView(), BenchView()
+        scoped.throttle_scope = scope
+
+        rows = [
+            ('no scope (other views)', SlidingWindow, unscoped),
+            ('sliding window', SlidingWindow, scoped),
+            ('DRF ScopedRateThrottle', Stock, scoped),
+        ]
+        backend = type(caches['default']).__name__
+        self.stdout.write(f"{number} requests from one client, {backend} cache:")
+        for label, throttle_class, view in rows:
+            # Count the cache calls of a client's second request, once its counters exist
+            request.META['REMOTE_ADDR'] = '203.0.113.7'
+            throttle_class().allow_request(request, view)
+            stack, calls = counting_cache_calls()
+            with stack:
+                if not throttle_class().allow_request(request, view):
+                    raise CommandError(f'{label} rejected a request')
+            per_check = len(calls)
+
+            # Each timed run uses a fresh client address so histories start empty
+            def run():
+                request.META['REMOTE_ADDR'] = f'198.51.100.{run.count % 250}'
+                run.count += 1
+                for _ in range(number):
+                    throttle_class().allow_request(request, view)
+            run.count = 0
+
+            micros = min(timeit.repeat(run, number=1, repeat=3)) / number * 1e6
+            self.stdout.write(f"  {label:26} {micros:8.1f} us per request, {per_check} cache calls")
@@ -0,0 +1,21 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import rebuild_related_recipes
+
+
+class Command(BaseCommand):
+    help = 'Recompute the related-recipes table from recipe text and co-purchases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=settings.RELATED_RECIPES_TOP_K)
+        parser.add_argument('--copurchase-weight', type=float, default=settings.RELATED_RECIPES_COPURCHASE_WEIGHT)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild_related_recipes(options['top_k'], options['copurchase_weight'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} related recipe rows in {time.monotonic() - started:.1f}s.'
+        ))
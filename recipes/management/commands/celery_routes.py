@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodie_haven.celery import app
+
+
+class Command(BaseCommand):
+    help = 'Show the queue, priority, rate limit and acks_late setting of every recipes task'
+
+    def handle(self, *args, **options):
+        app.loader.import_default_modules()
+        declared = {queue.name for queue in app.conf.task_queues}
+        undeclared = []
+
+        for name in sorted(task for task in app.tasks if task.startswith('recipes.')):
+            task = app.tasks[name]
+            route = app.amqp.router.route({}, name)
+            queue = route['queue'].name
+            self.stdout.write(
+                f"{name}: queue={queue} priority={route.get('priority', '-')} "
+                f"rate_limit={task.rate_limit or '-'} acks_late={task.acks_late}"
+            )
+            if queue not in declared:
+                undeclared.append(f'{name} -> {queue}')
+
+        if undeclared:
+            raise CommandError(f"Tasks routed to queues no worker declares: {', '.join(undeclared)}")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.fake_razorpay import FakeRazorpayServer
+
+
+class Command(BaseCommand):
+    help = 'Run a local fake Razorpay API for development and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each response')
+
+    def handle(self, *args, **options):
+        server = FakeRazorpayServer(options['host'], options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Fake Razorpay listening on {server.base_url} (set RAZOR_API_BASE_URL to use it)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.subscriptions import bulk_subscribe, read_emails
+
+
+class Command(BaseCommand):
+    help = 'Bulk import newsletter subscribers from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                stats = bulk_subscribe(read_emails(f, fmt), chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['created']} new subscribers "
+            f"({stats['existing']} already subscribed, {stats['invalid']} invalid)."
+        ))
@@ -0,0 +1,82 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What each kind of worker imports before it can serve its first request/task
+TARGETS = {
+    'web': (
+        "from foodie_haven.wsgi import application; "
+        "from django.urls import get_resolver; get_resolver().url_patterns"
+    ),
+    'celery': "from foodie_haven.celery import app; app.loader.import_default_modules()",
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+
+def measure(target):
+    """Run `target` in a fresh interpreter under -X importtime; returns (total_us, [(module, self_us, cumulative_us)])."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', TARGETS[target]],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'foodie_haven.settings')},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(f"{target} import failed:\n{result.stderr[-2000:]}")
+
+    total = 0
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append((name, int(self_us), int(cumulative_us)))
+        if len(indent) == 1:  # top-level import: its cumulative time includes all nested ones
+            total += int(cumulative_us)
+    return total, modules
+
+
+class Command(BaseCommand):
+    help = 'Measure import-time cost of booting a web or Celery worker (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', choices=sorted(TARGETS), action='append', help='Defaults to all targets')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per target; the fastest is reported')
+        parser.add_argument('--top', type=int, default=15, help='Packages to list by import time')
+        parser.add_argument('--check', action='store_true', help='Fail if a target exceeds its budget or imports a deferred module')
+
+    def handle(self, *args, **options):
+        over_budget = []
+        for target in options['target'] or sorted(TARGETS):
+            total, modules = min((measure(target) for _ in range(max(options['repeat'], 1))), key=lambda run: run[0])
+
+            # Group self time by top-level package to show where boot time goes
+            by_package = defaultdict(int)
+            for name, self_us, _ in modules:
+                by_package[name.split('.')[0]] += self_us
+
+            budget_ms = settings.STARTUP_IMPORT_BUDGET_MS[target]
+            self.stdout.write(f"{target}: {total / 1000:.0f} ms importing {len(modules)} modules (budget {budget_ms} ms)")
+            for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+                self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package}")
+
+            if total / 1000 > budget_ms:
+                over_budget.append(f"{target} ({total / 1000:.0f} ms > {budget_ms} ms)")
+
+            deferred = set(settings.STARTUP_DEFERRED_MODULES) & {name for name, _, _ in modules}
+            if deferred:
+                self.stdout.write(self.style.WARNING(f"  imports deferred modules: {', '.join(sorted(deferred))}"))
+                over_budget.append(f"{target} (imports {', '.join(sorted(deferred))})")
+
+        if options['check'] and over_budget:
+            raise CommandError(f"Startup budget exceeded: {'; '.join(over_budget)}")
+        if options['check']:
+            self.stdout.write(self.style.SUCCESS('Startup import times are within budget.'))
@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.snapshot import rebuild_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the public recipe snapshot served to anonymous visitors'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} public recipe snapshot rows in {time.monotonic() - started:.1f}s.'
+        ))
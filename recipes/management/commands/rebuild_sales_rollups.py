@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.sales import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-creator daily sales rollups from the orders table'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = rebuild_sales_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {rows} sales rollup rows in {time.monotonic() - started:.1f}s.'
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes import outbox
+
+
+class Command(BaseCommand):
+    help = 'Publish queued outbox messages to Celery, continuously or once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Relay everything due, then exit')
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['once']:
+            self.stdout.write(f"Relayed {outbox.relay_all(batch_size)} outbox messages.")
+            return
+
+        self.stdout.write(f"Relaying outbox messages every {settings.OUTBOX_POLL_INTERVAL}s when idle (Ctrl+C to stop).")
+        try:
+            while True:
+                close_old_connections()
+                if outbox.relay(batch_size) < batch_size:
+                    time.sleep(settings.OUTBOX_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
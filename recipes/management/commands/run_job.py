@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a registered maintenance job over primary key chunks in parallel processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('job', nargs='?', help='Job name; omit to list the registered jobs')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Primary keys per chunk')
+        parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first row')
+
+    def handle(self, *args, **options):
+        name = options['job']
+        if not name:
+            for job in jobs.JOBS.values():
+                self.stdout.write(f"{job.name} ({job.model.__name__}): {job.func.__doc__ or ''}")
+            return
+        if name not in jobs.JOBS:
+            raise CommandError(f"Unknown job '{name}'. Choices: {', '.join(sorted(jobs.JOBS))}")
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--workers and --chunk-size must be positive')
+
+        workers = options['workers']
+        if connection.vendor == 'sqlite' and workers > 1:
+            self.stdout.write(self.style.WARNING('SQLite allows a single writer; running with one worker'))
+            workers = 1
+
+        try:
+            changed, seconds = jobs.run(
+                name, workers, options['chunk_size'],
+                restart=options['restart'], report=self.stdout.write,
+            )
+        except Exception as e:
+            raise CommandError(f"{name} stopped: {e}. Re-run to resume from the checkpoint.")
+
+        self.stdout.write(self.style.SUCCESS(f"{name}: {changed} rows changed in {seconds:.1f}s"))
@@ -0,0 +1,153 @@
+"""
+Simulate purchase receipt latency while a bulk-mail flood is queued.
+
+The simulation is discrete-event and nothing is sent. The routed topology
+is read from the real configuration: queues and priorities from
+`task_routes`, rate limits from the task annotations, and worker queues
+and concurrency from the Procfile. It is compared with the same number of
+processes draining one FIFO default queue, as every task did before the
+routing.
+"""
+import heapq
+import os
+import random
+import shlex
+from collections import defaultdict, deque
+from pathlib import Path
+
+from celery.utils.time import rate
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodie_haven.celery import app
+
+RECEIPT_TASK = 'recipes.tasks.send_purchase_email'
+FLOOD_TASK = 'recipes.tasks.notify_new_recipe'
+
+
+def procfile_workers():
+    """(process type, queues, concurrency) of every Celery worker in the Procfile."""
+    workers = []
+    for line in (Path(settings.BASE_DIR) / 'Procfile').read_text().splitlines():
+        process_type, _, command = line.partition(':')
+        args = shlex.split(command)
+        if args[:1] != ['celery'] or 'worker' not in args:
+            continue
+        queues = args[args.index('-Q') + 1].split(',') if '-Q' in args else [app.conf.task_default_queue]
+        concurrency = int(args[args.index('--concurrency') + 1]) if '--concurrency' in args else os.cpu_count()
+        workers.append((process_type.strip(), queues, concurrency))
+    return workers
+
+
+def routed_topology():
+    """Routes {task: (queue, priority, tasks per second or None)} and workers as configured."""
+    app.loader.import_default_modules()
+    routes = {}
+    for name in (RECEIPT_TASK, FLOOD_TASK):
+        route = app.amqp.router.route({}, name)
+        limit = app.tasks[name].rate_limit
+        routes[name] = (route['queue'].name, route.get('priority', 0), rate(limit) if limit else None)
+    return routes, [(queues, concurrency) for _, queues, concurrency in procfile_workers()]
+
+
+def single_queue_topology(workers):
+    """Every task FIFO on the default queue, served by the same number of processes."""
+    queue = app.conf.task_default_queue
+    routes = {name: (queue, 0, None) for name in (RECEIPT_TASK, FLOOD_TASK)}
+    return routes, [([queue], sum(concurrency for _, concurrency in workers))]
+
+
+def simulate(arrivals, routes, workers, send_seconds):
+    """
+    Run `arrivals` ([(time, task name)], sorted by time) through the worker
+    processes. Returns (receipt latencies, time the last flood task finished).
+    Rate limits apply per worker instance, as in Celery.
+    """
+    upcoming = defaultdict(deque)  # queue -> arrivals not yet due
+    for seq, (at, name) in enumerate(arrivals):
+        queue, priority, _ = routes[name]
+        upcoming[queue].append((at, priority, seq, name))
+    ready = defaultdict(list)  # queue -> heap of due tasks by (priority, arrival)
+
+    processes = []  # (free at, process id, worker index)
+    for index, (_, concurrency) in enumerate(workers):
+        processes.extend((0.0, len(processes) + n, index) for n in range(concurrency))
+    heapq.heapify(processes)
+    next_token = defaultdict(float)  # (worker index, task name) -> earliest next start
+
+    latencies, flood_done = [], 0.0
+    while processes:
+        now, pid, index = heapq.heappop(processes)
+        queues = workers[index][0]
+        for queue in queues:
+            while upcoming[queue] and upcoming[queue][0][0] <= now:
+                at, priority, seq, name = upcoming[queue].popleft()
+                heapq.heappush(ready[queue], (priority, at, seq, name))
+        candidates = [queue for queue in queues if ready[queue]]
+        if not candidates:
+            pending = [upcoming[queue][0][0] for queue in queues if upcoming[queue]]
+            if pending:
+                heapq.heappush(processes, (min(pending), pid, index))
+            continue
+
+        queue = min(candidates, key=lambda queue: ready[queue][0][:2])
+        _, at, _, name = heapq.heappop(ready[queue])
+        start = now
+        per_second = routes[name][2]
+        if per_second:
+            start = max(now, next_token[index, name])
+            next_token[index, name] = start + 1 / per_second
+        finish = start + send_seconds
+        if name == RECEIPT_TASK:
+            latencies.append(finish - at)
+        else:
+            flood_done = max(flood_done, finish)
+        heapq.heappush(processes, (finish, pid, index))
+    return latencies, flood_done
+
+
+def workload(flood, receipts, window, seed=0):
+    """`flood` bulk mails queued at once, then `receipts` purchases at random over `window` seconds."""
+    rng = random.Random(seed)
+    arrivals = [(0.0, FLOOD_TASK)] * flood
+    arrivals += [(rng.uniform(0, window), RECEIPT_TASK) for _ in range(receipts)]
+    return sorted(arrivals, key=lambda arrival: arrival[0])
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Simulate purchase receipt latency during a bulk-mail flood, routed vs one default queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flood', type=int, default=2000, help='Bulk mails queued at the start')
+        parser.add_argument('--receipts', type=int, default=100, help='Purchase receipts during the window')
+        parser.add_argument('--window', type=float, default=600, help='Seconds over which purchases arrive')
+        parser.add_argument('--send-seconds', type=float, default=0.5, help='Time to send one email')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['receipts'] < 1:
+            raise CommandError('--receipts must be at least 1')
+        arrivals = workload(options['flood'], options['receipts'], options['window'], options['seed'])
+        routes, workers = routed_topology()
+        if not workers:
+            raise CommandError('The Procfile starts no Celery worker')
+
+        self.stdout.write(
+            f"{options['flood']} bulk mails queued, {options['receipts']} receipts over {options['window']:g} s, "
+            f"{options['send_seconds']:g} s per email:"
+        )
+        self.stdout.write(f"  {'topology':20} {'p50':>9} {'p95':>9} {'max':>9} {'flood drained':>14}")
+        for label, (topology_routes, topology_workers) in (
+            ('one default queue', single_queue_topology(workers)),
+            ('routed (Procfile)', (routes, workers)),
+        ):
+            latencies, flood_done = simulate(arrivals, topology_routes, topology_workers, options['send_seconds'])
+            self.stdout.write(
+                f"  {label:20} {percentile(latencies, 0.5):8.1f}s {percentile(latencies, 0.95):8.1f}s "
+                f"{max(latencies):8.1f}s {flood_done:13.0f}s"
+            )
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0011_alter_recipe_image"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="razorpay_order_id",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="amount",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Recipe price at checkout",
+                max_digits=7,
+                null=True,
+            ),
+        ),
+        # Orders placed before verification existed are treated as settled;
+        # new orders start out pending until reconciliation confirms them.
+        migrations.AddField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("paid", "Paid"), ("failed", "Failed")],
+                db_index=True,
+                default="paid",
+                max_length=10,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="status",
+            field=models.CharField(
+                choices=[("pending", "Pending"), ("paid", "Paid"), ("failed", "Failed")],
+                db_index=True,
+                default="pending",
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_content(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeContent = apps.get_model("recipes", "RecipeContent")
+    last_pk = 0
+    while True:
+        batch = list(
+            Recipe.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", "description", "process")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        RecipeContent.objects.bulk_create(
+            [RecipeContent(recipe_id=pk, description=description, process=process) for pk, description, process in batch]
+        )
+        last_pk = batch[-1][0]
+
+
+def restore_content(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeContent = apps.get_model("recipes", "RecipeContent")
+    last_pk = 0
+    while True:
+        batch = list(RecipeContent.objects.filter(pk__gt=last_pk).order_by("pk")[:BATCH_SIZE])
+        if not batch:
+            break
+        Recipe.objects.bulk_update(
+            [Recipe(pk=content.recipe_id, description=content.description, process=content.process) for content in batch],
+            ["description", "process"],
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0013_claimsuser"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecipeContent",
+            fields=[
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="content",
+                        serialize=False,
+                        to="recipes.recipe",
+                    ),
+                ),
+                ("description", models.TextField()),
+                (
+                    "process",
+                    models.TextField(
+                        blank=True,
+                        help_text="Step-by-step process to prepare the recipe",
+                        null=True,
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(copy_content, restore_content),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0014_recipecontent"),
+    ]
+
+    operations = [
+        # Give description a default first so unapplying can re-add the column
+        # to a populated table before 0014 copies the text back.
+        migrations.AlterField(
+            model_name="recipe",
+            name="description",
+            field=models.TextField(default=""),
+        ),
+        migrations.RemoveField(
+            model_name="recipe",
+            name="description",
+        ),
+        migrations.RemoveField(
+            model_name="recipe",
+            name="process",
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:48
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def backfill_change_seq(apps, schema_editor):
+    # Existing recipes enter the feed in primary key order
+    Recipe = apps.get_model("recipes", "Recipe")
+    ChangeSequence = apps.get_model("recipes", "ChangeSequence")
+    Recipe.objects.update(change_seq=F("pk"), updated_at=F("created_at"))
+    last = Recipe.objects.aggregate(last=Max("pk"))["last"] or 0
+    ChangeSequence.objects.create(name="recipe", value=last)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0015_remove_recipe_description_process"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeSequence",
+            fields=[
+                ("name", models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="change_seq",
+            field=models.BigIntegerField(default=0, help_text="Position in the recipe change feed"),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Set when the recipe is deleted; the row stays as a tombstone for the change feed",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["change_seq", "id"], name="recipe_change_feed_idx"),
+        ),
+        migrations.RunPython(backfill_change_seq, migrations.RunPython.noop),
+    ]
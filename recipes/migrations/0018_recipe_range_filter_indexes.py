@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0017_jobcheckpoint"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["is_public", "price"], name="recipe_public_price_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["is_public", "preparation_time"], name="recipe_public_prep_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["is_public", "cooking_time"], name="recipe_public_cook_time_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["is_public", "rating"], name="recipe_public_rating_idx"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0018_recipe_range_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedRecipe",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("score", models.FloatField()),
+                ("recipe", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="related_recipes", to="recipes.recipe")),
+                ("related", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="recipes.recipe")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("recipe", "rank"), name="related_recipe_rank_unique")],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-19 01:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+
+def backfill_rollups(apps, schema_editor):
+    Order = apps.get_model("recipes", "Order")
+    CreatorDailySales = apps.get_model("recipes", "CreatorDailySales")
+    rows = (
+        Order.objects.exclude(status="failed")
+        .annotate(day=TruncDate("created_at", tzinfo=timezone.get_current_timezone()))
+        .values("recipe__created_by_id", "recipe_id", "day")
+        .annotate(units=Count("id"), revenue=Sum(Coalesce("amount", "recipe__price")))
+        .order_by()
+    )
+    CreatorDailySales.objects.bulk_create(
+        [
+            CreatorDailySales(
+                creator_id=row["recipe__created_by_id"],
+                recipe_id=row["recipe_id"],
+                day=row["day"],
+                units=row["units"],
+                revenue=row["revenue"] or 0,
+            )
+            for row in rows.iterator(chunk_size=5000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0019_relatedrecipe"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CreatorDailySales",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField()),
+                ("units", models.IntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ("creator", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+                ("recipe", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="recipes.recipe")),
+            ],
+            options={
+                "constraints": [models.UniqueConstraint(fields=("creator", "day", "recipe"), name="creator_daily_sales_unique")],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
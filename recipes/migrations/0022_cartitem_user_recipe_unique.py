@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-19 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+DELETE_BATCH_SIZE = 500
+
+
+def dedupe_cart_items(apps, schema_editor):
+    """Keep the oldest row of each (user, recipe) pair and delete the rest."""
+    CartItem = apps.get_model("recipes", "CartItem")
+    rows = CartItem.objects.order_by("user_id", "recipe_id", "id").values_list("id", "user_id", "recipe_id")
+    duplicates = []
+    previous = None
+    for pk, user_id, recipe_id in rows.iterator(chunk_size=5000):
+        if (user_id, recipe_id) == previous:
+            duplicates.append(pk)
+        previous = (user_id, recipe_id)
+    for start in range(0, len(duplicates), DELETE_BATCH_SIZE):
+        CartItem.objects.filter(pk__in=duplicates[start:start + DELETE_BATCH_SIZE]).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0021_outboxmessage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(fields=("user", "recipe"), name="cart_item_user_recipe_unique"),
+        ),
+    ]
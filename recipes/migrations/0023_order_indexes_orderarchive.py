@@ -0,0 +1,57 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0022_cartitem_user_recipe_unique"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderArchive",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("payment_id", models.CharField(max_length=100)),
+                ("razorpay_order_id", models.CharField(blank=True, default="", max_length=100)),
+                ("amount", models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True)),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("paid", "Paid"), ("failed", "Failed")], max_length=10)),
+                ("created_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["user", "recipe"], name="order_user_recipe_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="order_created_idx"),
+        ),
+        migrations.AddField(
+            model_name="orderarchive",
+            name="recipe",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="recipes.recipe"),
+        ),
+        migrations.AddField(
+            model_name="orderarchive",
+            name="user",
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name="orderarchive",
+            index=models.Index(fields=["user", "recipe"], name="order_archive_user_recipe_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="orderarchive",
+            index=models.Index(fields=["created_at"], name="order_archive_created_idx"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 03:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0023_order_indexes_orderarchive"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicRecipeSnapshot",
+            fields=[
+                ("recipe", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="+", serialize=False, to="recipes.recipe")),
+                ("title", models.CharField(max_length=100)),
+                ("price", models.DecimalField(decimal_places=2, max_digits=7)),
+                ("preparation_time", models.PositiveIntegerField(null=True)),
+                ("cooking_time", models.PositiveIntegerField(null=True)),
+                ("rating", models.DecimalField(decimal_places=1, max_digits=3, null=True)),
+                ("data", models.JSONField()),
+                ("category", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to="recipes.category")),
+                ("created_by", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
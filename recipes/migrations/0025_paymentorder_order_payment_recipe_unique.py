@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-19 09:20
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+DELETE_BATCH_SIZE = 500
+# When duplicates disagree, the merged order takes the most settled status
+STATUS_RANK = {"failed": 0, "pending": 1, "paid": 2}
+
+
+def merge_duplicate_orders(apps, schema_editor):
+    """
+    Keep the oldest order of each (payment_id, recipe) pair, with the most
+    settled status of the group, and delete the rest. The sales rollups lose
+    what the deleted rows had added (failed orders were never counted).
+    """
+    Order = apps.get_model("recipes", "Order")
+    CreatorDailySales = apps.get_model("recipes", "CreatorDailySales")
+    rows = Order.objects.order_by("payment_id", "recipe_id", "created_at", "id").values_list(
+        "id", "payment_id", "recipe_id", "recipe__created_by_id", "recipe__price", "amount", "status", "created_at",
+    )
+    duplicates, promotions = [], {}
+    deltas = defaultdict(lambda: [0, Decimal("0")])
+    keeper = None
+    for pk, payment_id, recipe_id, creator_id, price, amount, status, created_at in rows.iterator(chunk_size=5000):
+        if keeper is None or (payment_id, recipe_id) != keeper["key"]:
+            keeper = {"key": (payment_id, recipe_id), "pk": pk, "status": status, "counted": status != "failed",
+                      "sale": (creator_id, timezone.localdate(created_at), recipe_id), "amount": amount or price}
+            continue
+        duplicates.append(pk)
+        if status != "failed":
+            delta = deltas[(creator_id, timezone.localdate(created_at), recipe_id)]
+            delta[0] -= 1
+            delta[1] -= amount or price or 0
+        if STATUS_RANK.get(status, 0) > STATUS_RANK.get(keeper["status"], 0):
+            keeper["status"] = promotions[keeper["pk"]] = status
+            if not keeper["counted"]:
+                # A failed keeper now counts as a sale
+                keeper["counted"] = True
+                delta = deltas[keeper["sale"]]
+                delta[0] += 1
+                delta[1] += keeper["amount"] or 0
+
+    for start in range(0, len(duplicates), DELETE_BATCH_SIZE):
+        Order.objects.filter(pk__in=duplicates[start:start + DELETE_BATCH_SIZE]).delete()
+    for pk, status in promotions.items():
+        Order.objects.filter(pk=pk).update(status=status)
+    for (creator_id, day, recipe_id), (units, revenue) in deltas.items():
+        CreatorDailySales.objects.filter(creator_id=creator_id, day=day, recipe_id=recipe_id).update(
+            units=F("units") + units, revenue=F("revenue") + revenue,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0024_publicrecipesnapshot"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentOrder",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("razorpay_order_id", models.CharField(max_length=100, unique=True)),
+                ("recipe_ids", models.JSONField(default=list)),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=9)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(merge_duplicate_orders, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(fields=("payment_id", "recipe"), name="order_payment_recipe_unique"),
+        ),
+        migrations.AddField(
+            model_name="paymentorder",
+            name="user",
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL),
+        ),
+    ]
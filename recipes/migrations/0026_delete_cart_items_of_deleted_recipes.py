@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 09:40
+
+from django.db import migrations
+
+
+def delete_cart_items_of_deleted_recipes(apps, schema_editor):
+    """Recipe.soft_delete now empties carts; do the same for recipes deleted before."""
+    CartItem = apps.get_model("recipes", "CartItem")
+    CartItem.objects.filter(recipe__deleted_at__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0025_paymentorder_order_payment_recipe_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_cart_items_of_deleted_recipes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0026_delete_cart_items_of_deleted_recipes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentorder",
+            name="prices",
+            field=models.JSONField(default=dict, help_text="Price charged per recipe id"),
+        ),
+    ]
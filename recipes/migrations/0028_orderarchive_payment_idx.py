@@ -0,0 +1,16 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recipes", "0027_paymentorder_prices"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="orderarchive",
+            index=models.Index(fields=["payment_id", "recipe"], name="order_archive_payment_idx"),
+        ),
+    ]
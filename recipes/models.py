@@ -1,5 +1,59 @@
-from django.db import models
+import uuid
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+
+class ClaimsUser(User):
+    """
+    A User built from JWT claims (see recipes.authentication) whose other
+    columns are deferred. The first access to any of them loads all of them
+    in a single query, so views that only need id/username/is_staff never hit
+    the database for the user.
+    """
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+class ChangeSequence(models.Model):
+    """
+    Named monotonic counters for change feeds. Allocating a value updates the
+    counter row, which stays locked until the caller's transaction commits,
+    so sequence order matches commit order and a feed reader never skips a
+    change that commits late.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def allocate(cls, name, count=1):
+        """Reserve `count` values and return the first; call inside a transaction."""
+        updated = cls.objects.filter(name=name).update(value=F('value') + count)
+        if not updated:
+            cls.objects.get_or_create(name=name)
+            cls.objects.filter(name=name).update(value=F('value') + count)
+        return cls.objects.filter(name=name).values_list('value', flat=True).get() - count + 1
+
+
+class JobCheckpoint(models.Model):
+    """
+    Progress of a `run_job` maintenance job: every primary key up to and
+    including `last_pk` has been processed.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    last_pk = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_pk}"
 
 
 class Category(models.Model):
@@ -8,24 +62,95 @@ class Category(models.Model):
     def __str__(self):
         return self.name
     
+class RecipeManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Recipe(models.Model):
     title = models.CharField(max_length=100, db_index=True)
     image = models.URLField(max_length=500, null=True, blank=True) 
-    description = models.TextField()
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     preparation_time = models.PositiveIntegerField(null=True, blank=True, help_text="Time in minutes to prepare the ingredients")
     cooking_time = models.PositiveIntegerField(null=True, blank=True, help_text="Time in minutes to cook the recipe")
     rating = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True, help_text="Average rating out of 5.0")
-    process = models.TextField(help_text="Step-by-step process to prepare the recipe", null=True, blank=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     price = models.DecimalField(max_digits=7, decimal_places=2, default=100)
     is_public = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, help_text="Set when the recipe is deleted; the row stays as a tombstone for the change feed")
+    change_seq = models.BigIntegerField(default=0, help_text="Position in the recipe change feed")
+
+    # Deleted recipes are hidden everywhere except the change feed and
+    # purchase history, which use all_objects.
+    objects = RecipeManager()
+    all_objects = models.Manager()
 
+    CHANGE_SEQUENCE = 'recipe'
+
+    class Meta:
+        indexes = [
+            # Change feed cursor; id breaks ties for rows loaded without save()
+            models.Index(fields=['change_seq', 'id'], name='recipe_change_feed_idx'),
+            # Range filters on the public listing (see recipes.facets)
+            models.Index(fields=['is_public', 'price'], name='recipe_public_price_idx'),
+            models.Index(fields=['is_public', 'preparation_time'], name='recipe_public_prep_time_idx'),
+            models.Index(fields=['is_public', 'cooking_time'], name='recipe_public_cook_time_idx'),
+            models.Index(fields=['is_public', 'rating'], name='recipe_public_rating_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            self.change_seq = ChangeSequence.allocate(self.CHANGE_SEQUENCE)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq', 'updated_at'}
+            super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        with transaction.atomic():
+            self.deleted_at = timezone.now()
+            self.save(update_fields=['deleted_at'])
+            # The tombstone must not stay in carts, where it would still be charged for
+            CartItem.objects.filter(recipe=self).delete()
     
     def __str__(self):
         return self.title
+
+
+class RecipeContent(models.Model):
+    """
+    The long text of a recipe, kept out of the Recipe row so list queries,
+    counts and filters only read the narrow columns.
+    """
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='content')
+    description = models.TextField()
+    process = models.TextField(help_text="Step-by-step process to prepare the recipe", null=True, blank=True)
+
+    def __str__(self):
+        return f"Content of {self.recipe_id}"
     
+class RelatedRecipe(models.Model):
+    """
+    Precomputed "you might also like" list: the top recipes similar to
+    `recipe`, best first. Rebuilt in full by recipes.recommendations.
+    """
+    # Indexed through the (recipe, rank) constraint below
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='related_recipes', db_index=False)
+    related = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also the index the related-recipes endpoint reads through
+            models.UniqueConstraint(fields=['recipe', 'rank'], name='related_recipe_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} -> {self.related_id} ({self.score:.3f})"
+
+
 class Subscription(models.Model):
     email = models.EmailField(unique=True)
     subscribed_at = models.DateTimeField(auto_now_add=True)
@@ -51,8 +176,164 @@ class CartItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart_items')
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'], name='cart_item_user_recipe_unique'),
+        ]
+
+    @classmethod
+    def add(cls, user_id, recipe_ids):
+        """
+        Put recipes in a user's cart, skipping any already there, with one
+        INSERT ... ON CONFLICT DO NOTHING. Returns (cart count, ids of
+        recipes that do not exist).
+        """
+        recipe_ids = set(recipe_ids)
+        found = set(Recipe.objects.filter(pk__in=recipe_ids).values_list('pk', flat=True))
+        cls.objects.bulk_create(
+            [cls(user_id=user_id, recipe_id=recipe_id) for recipe_id in sorted(found)],
+            ignore_conflicts=True,
+        )
+        return cls.objects.filter(user_id=user_id).count(), sorted(recipe_ids - found)
+
+class PaymentOrder(models.Model):
+    """
+    A Razorpay order created by create_payment_order: who it was created
+    for, which recipes it pays for at what price and the amount charged.
+    OrderCreateView only accepts orders for recipes listed here, so a
+    verified payment can never be spent on anything else.
+    """
+    razorpay_order_id = models.CharField(max_length=100, unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    recipe_ids = models.JSONField(default=list)
+    prices = models.JSONField(default=dict, help_text="Price charged per recipe id")
+    amount = models.DecimalField(max_digits=9, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.razorpay_order_id} for {self.user_id}: {self.amount}"
+
+    def price_of(self, recipe):
+        # Orders created before prices were stored fall back to the current price
+        price = self.prices.get(str(recipe.pk))
+        return recipe.price if price is None else Decimal(price)
+
+
 class Order(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_PAID = 'paid'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PAID, 'Paid'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE)
     payment_id = models.CharField(max_length=100)
+    razorpay_order_id = models.CharField(max_length=100, blank=True, default='')
+    amount = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True, help_text="Recipe price at checkout")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # A payment pays for each recipe of its Razorpay order once
+            models.UniqueConstraint(fields=['payment_id', 'recipe'], name='order_payment_recipe_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'recipe'], name='order_user_recipe_idx'),
+            # Reconciliation: pending orders in the lookback window
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            # Archival: the oldest orders first
+            models.Index(fields=['created_at'], name='order_created_idx'),
+        ]
+
+
+class OrderArchive(models.Model):
+    """
+    Settled orders moved out of Order once they are older than
+    ORDER_ARCHIVE_AFTER_DAYS (see recipes.archive), keeping their original
+    ids. Order stays small and hot; recipes.archive has helpers that read
+    both tables when the full history is wanted.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    payment_id = models.CharField(max_length=100)
+    razorpay_order_id = models.CharField(max_length=100, blank=True, default='')
+    amount = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'recipe'], name='order_archive_user_recipe_idx'),
+            models.Index(fields=['created_at'], name='order_archive_created_idx'),
+            # OrderSerializer refuses payments spent on archived orders
+            models.Index(fields=['payment_id', 'recipe'], name='order_archive_payment_idx'),
+        ]
+
+
+class CreatorDailySales(models.Model):
+    """
+    Sales rollup per recipe author, recipe and day (in TIME_ZONE), kept up
+    to date as orders commit (see recipes.sales). Dashboards read these rows
+    instead of scanning orders.
+    """
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', db_index=False)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='+')
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Leading (creator, day) also serves the dashboard's date-range reads
+            models.UniqueConstraint(fields=['creator', 'day', 'recipe'], name='creator_daily_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.creator_id} {self.day} recipe {self.recipe_id}: {self.units} / {self.revenue}"
+
+
+class OutboxMessage(models.Model):
+    """
+    A Celery task waiting to be published, written in the same transaction
+    as the rows it refers to (see recipes.outbox). The relay publishes it
+    and deletes the row; `available_at` is pushed forward while a relay
+    holds the row, so a crashed relay's messages are picked up again.
+    """
+    task = models.CharField(max_length=200)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    task_id = models.UUIDField(default=uuid.uuid4, editable=False)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.task} ({self.task_id})"
+
+
+class PublicRecipeSnapshot(models.Model):
+    """
+    One row per public recipe, holding the columns the anonymous recipe
+    list filters on and the recipe already serialized (`data`), so that list
+    is served without the Category/User joins or the serializer. Kept in
+    step by recipes.snapshot on every change and rebuilt periodically.
+    """
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=100)
+    price = models.DecimalField(max_digits=7, decimal_places=2)
+    preparation_time = models.PositiveIntegerField(null=True)
+    cooking_time = models.PositiveIntegerField(null=True)
+    rating = models.DecimalField(max_digits=3, decimal_places=1, null=True)
+    data = models.JSONField()
+
+    def __str__(self):
+        return f"Snapshot of {self.recipe_id}"
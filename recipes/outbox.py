@@ -0,0 +1,96 @@
+"""
+Transactional outbox for Celery tasks.
+
+Views call `enqueue()` instead of `task.delay()`. That writes an
+OutboxMessage row in the caller's transaction, so a request never waits on
+the broker, and a task is only ever sent for rows that actually committed.
+`relay()` publishes pending messages in batches and deletes them once the
+broker has accepted them. It runs from the `relay_outbox` command and,
+as a backstop, from Celery beat.
+
+Delivery is at least once. A relay that dies after publishing but before
+deleting leaves the rows to be sent again when their lease runs out. Every
+publish of a message reuses its `task_id`, so duplicates can be recognised.
+"""
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+
+def _task_name(task):
+    return task if isinstance(task, str) else task.name
+
+
+def enqueue(task, *args, **kwargs):
+    """Queue `task(*args, **kwargs)` to be sent once the current transaction commits."""
+    return OutboxMessage.objects.create(task=_task_name(task), args=list(args), kwargs=kwargs)
+
+
+def enqueue_many(task, arg_lists):
+    """Queue one call of `task` per argument list, in a single INSERT."""
+    name = _task_name(task)
+    return OutboxMessage.objects.bulk_create(
+        [OutboxMessage(task=name, args=list(args)) for args in arg_lists], batch_size=500,
+    )
+
+
+def _claim(batch_size, lease_seconds):
+    """Lease up to `batch_size` due messages to this relay, oldest first."""
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(
+            OutboxMessage.objects.filter(available_at__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return []
+        OutboxMessage.objects.filter(pk__in=pks).update(
+            available_at=now + timedelta(seconds=lease_seconds),
+            attempts=F('attempts') + 1,
+        )
+    return list(OutboxMessage.objects.filter(pk__in=pks).order_by('pk'))
+
+
+def relay(batch_size=None, lease_seconds=None):
+    """Publish one batch of due messages; returns how many were sent."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    lease_seconds = lease_seconds or settings.OUTBOX_LEASE_SECONDS
+    messages = _claim(batch_size, lease_seconds)
+    if not messages:
+        return 0
+
+    sent = []
+    try:
+        # One broker connection for the whole batch
+        with current_app.producer_or_acquire() as producer:
+            for message in messages:
+                current_app.send_task(
+                    message.task, args=message.args, kwargs=message.kwargs,
+                    task_id=str(message.task_id), producer=producer,
+                )
+                sent.append(message.pk)
+    except Exception as e:
+        # The rest stay leased and are retried when the lease runs out
+        print(f"⚠️ Outbox relay stopped after {len(sent)} of {len(messages)} messages: {e}", flush=True)
+    finally:
+        OutboxMessage.objects.filter(pk__in=sent).delete()
+    return len(sent)
+
+
+def relay_all(batch_size=None):
+    """Relay until nothing is due or a batch fails; returns how many were sent."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    total = 0
+    while True:
+        sent = relay(batch_size)
+        total += sent
+        if sent < batch_size:
+            return total
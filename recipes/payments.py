@@ -0,0 +1,240 @@
+"""
+Razorpay gateway access shared by the payment views and Celery tasks.
+
+A single pooled client is kept per process so requests reuse keep-alive
+connections instead of paying a TLS handshake each time. Every call runs with
+strict timeouts, a bounded number of retries and a circuit breaker, so a slow
+or failing gateway cannot tie up the gunicorn workers.
+
+The razorpay SDK (which pulls in requests and pkg_resources) is imported on
+first use rather than at module import, so web and Celery workers that never
+take a payment do not pay for it at boot.
+"""
+import hashlib
+import hmac
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+
+class PaymentGatewayUnavailable(Exception):
+    """Raised when the gateway is down, timing out or the breaker is open."""
+
+
+class PaymentGatewayError(Exception):
+    """Raised when the gateway answered but refused the request; retrying would not help."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls until
+    `reset_timeout` seconds have passed, then lets a single trial call through.
+    Other calls are still rejected until the trial records its outcome: success
+    closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # Half-open. A trial that never reports back expires like the breaker does.
+            if self._trial_started is not None and now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._trial_started = None
+
+
+_client = None
+_retryable_errors = None
+_client_lock = threading.Lock()
+breaker = CircuitBreaker(settings.RAZOR_BREAKER_THRESHOLD, settings.RAZOR_BREAKER_RESET_SECONDS)
+
+
+def retryable_errors():
+    """
+    Errors worth retrying: the request may never have reached the gateway, or
+    the gateway failed on its side. BadRequestError is never retried.
+    """
+    global _retryable_errors
+    if _retryable_errors is None:
+        import requests
+        from razorpay.errors import GatewayError, ServerError
+        _retryable_errors = (requests.ConnectionError, requests.Timeout, ServerError, GatewayError)
+    return _retryable_errors
+
+
+def rejected_errors():
+    """Errors where the gateway is up but refused the request."""
+    from razorpay.errors import BadRequestError, SignatureVerificationError
+    return (BadRequestError, SignatureVerificationError)
+
+
+def get_client():
+    """Return the process-wide Razorpay client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import razorpay
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.RAZOR_POOL_SIZE,
+                    max_retries=0,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _client = razorpay.Client(
+                    session=session,
+                    auth=(settings.RAZOR_KEY_ID, settings.RAZOR_KEY_SECRET),
+                    base_url=settings.RAZOR_API_BASE_URL,
+                )
+    return _client
+
+
+def reset_client():
+    """Drop the cached client, e.g. after settings change or in a forked worker."""
+    global _client
+    with _client_lock:
+        _client = None
+    breaker.record_success()
+
+
+def _timeout():
+    return (settings.RAZOR_CONNECT_TIMEOUT, settings.RAZOR_READ_TIMEOUT)
+
+
+def call_gateway(func, *args, recover=None, **kwargs):
+    """
+    Call a Razorpay client method with timeouts, retries and the breaker.
+
+    `recover` is an optional callable run before each retry; if it returns a
+    result, that result is used instead of repeating a non-idempotent call.
+    A refused request raises PaymentGatewayError without being retried.
+    """
+    if not breaker.allow():
+        raise PaymentGatewayUnavailable('Payment gateway circuit is open')
+    try:
+        return _call_with_retries(func, args, kwargs, recover)
+    except rejected_errors() as e:
+        # The gateway answered, so it counts as up
+        breaker.record_success()
+        raise PaymentGatewayError(str(e)) from e
+
+
+def _call_with_retries(func, args, kwargs, recover):
+    errors = retryable_errors()
+    last_error = None
+    for attempt in range(settings.RAZOR_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(settings.RAZOR_RETRY_BACKOFF * (2 ** (attempt - 1)))
+            if recover is not None:
+                try:
+                    recovered = recover()
+                except errors:
+                    recovered = None
+                if recovered is not None:
+                    breaker.record_success()
+                    return recovered
+        try:
+            result = func(*args, timeout=_timeout(), **kwargs)
+        except errors as e:
+            last_error = e
+            print(f"⚠️ Razorpay call failed (attempt {attempt + 1}): {e}", flush=True)
+            continue
+        breaker.record_success()
+        return result
+
+    breaker.record_failure()
+    raise PaymentGatewayUnavailable(str(last_error))
+
+
+def create_order(amount_paise, receipt=None, notes=None):
+    """
+    Create a Razorpay order for `amount_paise`.
+
+    `receipt` doubles as the idempotency key: if an attempt times out after
+    the gateway accepted it, the retry finds the existing order by receipt
+    instead of creating a second one.
+    """
+    client = get_client()
+    receipt = receipt or uuid.uuid4().hex
+    payload = {
+        'amount': amount_paise,
+        'currency': 'INR',
+        'receipt': receipt,
+        'payment_capture': 1,
+    }
+    if notes:
+        payload['notes'] = notes
+
+    def find_existing():
+        existing = client.order.all({'receipt': receipt}, timeout=_timeout())
+        items = existing.get('items') or []
+        return items[0] if items else None
+
+    return call_gateway(client.order.create, payload, recover=find_existing)
+
+
+def payment_signature(razorpay_order_id, payment_id):
+    """The signature Razorpay Checkout returns for a successful payment."""
+    message = f'{razorpay_order_id}|{payment_id}'.encode()
+    return hmac.new(settings.RAZOR_KEY_SECRET.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_payment_signature(razorpay_order_id, payment_id, signature):
+    """Check a Checkout signature locally, without a gateway round trip."""
+    if not (razorpay_order_id and payment_id and signature):
+        return False
+    return hmac.compare_digest(payment_signature(razorpay_order_id, payment_id), str(signature))
+
+
+def fetch_payments(since, until, page_size=100, max_pages=50):
+    """
+    Fetch all payments created between two unix timestamps, one page per
+    call, and return them keyed by payment id.
+    """
+    client = get_client()
+    found = {}
+    for page in range(max_pages):
+        result = call_gateway(client.payment.all, {
+            'from': int(since),
+            'to': int(until),
+            'count': page_size,
+            'skip': page * page_size,
+        })
+        items = result.get('items') or []
+        for payment in items:
+            found[payment['id']] = payment
+        if len(items) < page_size:
+            break
+    return found
@@ -0,0 +1,198 @@
+"""
+On-demand request profiling for staff.
+
+A request carrying `?profile=1` or an `X-Profile: 1` header from a staff
+user (an admin session or a staff JWT) runs its view under cProfile.
+With `profile=pyinstrument`, the sampling profiler is used instead when
+that package is installed. The capture covers the view and rendering the
+response. It is written to PROFILING_DIR, which keeps only the newest
+PROFILING_MAX_FILES captures, and its file name comes back in the
+X-Profile-Id header. Staff browse and download captures at
+/admin/profiles/.
+
+Other requests only pay for a substring check on the query string and a
+header lookup. With PROFILING_ENABLED off, the middleware is removed
+altogether.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+from django.utils.deprecation import MiddlewareMixin
+from django.utils import timezone
+from django.utils.text import slugify
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PROFILE_SUFFIXES = ('.prof', '.html')
+PROFILE_NAME_RE = re.compile(r'^[\w-]+\.(prof|html)$')
+
+
+def profile_dir():
+    return Path(settings.PROFILING_DIR)
+
+
+def requested_profiler(request):
+    """'cprofile', 'pyinstrument' or None, from the query flag or X-Profile header."""
+    value = request.META.get('HTTP_X_PROFILE')
+    if value is None and 'profile=' in request.META.get('QUERY_STRING', ''):
+        value = request.GET.get('profile')
+    if not value or value in ('0', 'false'):
+        return None
+    return 'pyinstrument' if value == 'pyinstrument' else 'cprofile'
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    # API clients authenticate with a token inside the view, so check it here
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user.is_staff
+    except APIException:
+        return False
+
+
+def _capture_name(request, elapsed_ms, suffix):
+    stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+    path = slugify(request.path.replace('/', '-'))[:60] or 'root'
+    return f'{stamp}-{uuid.uuid4().hex[:8]}-{request.method.lower()}-{path}-{elapsed_ms}ms{suffix}'
+
+
+def _prune():
+    """Keep only the newest PROFILING_MAX_FILES captures; names sort by time."""
+    for name in list_profiles()[settings.PROFILING_MAX_FILES:]:
+        try:
+            os.remove(profile_dir() / name['name'])
+        except FileNotFoundError:
+            pass  # another worker pruned it first
+
+
+def _run_view(view_func, request, view_args, view_kwargs):
+    response = view_func(request, *view_args, **view_kwargs)
+    # DRF responses are rendered after the middleware; include that work
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def _profile_cprofile(view_func, request, view_args, view_kwargs):
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    response = profiler.runcall(_run_view, view_func, request, view_args, view_kwargs)
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    name = _capture_name(request, elapsed_ms, '.prof')
+    profiler.dump_stats(profile_dir() / name)
+    return response, name
+
+
+def _profile_pyinstrument(view_func, request, view_args, view_kwargs):
+    from pyinstrument import Profiler
+
+    profiler = Profiler()
+    started = time.perf_counter()
+    with profiler:
+        response = _run_view(view_func, request, view_args, view_kwargs)
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    name = _capture_name(request, elapsed_ms, '.html')
+    (profile_dir() / name).write_text(profiler.output_html(), encoding='utf-8')
+    return response, name
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profiler = requested_profiler(request)
+        if profiler is None:
+            return None
+        # The SSE stream is async and never finishes; there is nothing to capture
+        if iscoroutinefunction(view_func) or not is_staff(request):
+            return None
+
+        profile_dir().mkdir(parents=True, exist_ok=True)
+        if profiler == 'pyinstrument':
+            try:
+                response, name = _profile_pyinstrument(view_func, request, view_args, view_kwargs)
+            except ImportError:
+                response, name = _profile_cprofile(view_func, request, view_args, view_kwargs)
+        else:
+            response, name = _profile_cprofile(view_func, request, view_args, view_kwargs)
+        _prune()
+        print(f"🔬 Profiled {request.method} {request.path} -> {name}", flush=True)
+        response['X-Profile-Id'] = name
+        return response
+
+
+def list_profiles():
+    """Captures newest first, as dicts with name, size and modified."""
+    try:
+        entries = [entry for entry in os.scandir(profile_dir()) if entry.name.endswith(PROFILE_SUFFIXES)]
+    except FileNotFoundError:
+        return []
+    profiles = []
+    for entry in entries:
+        try:
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+        profiles.append({
+            'name': entry.name,
+            'size': stat.st_size,
+            'modified': datetime.fromtimestamp(stat.st_mtime, tz=timezone.get_current_timezone()),
+        })
+    return sorted(profiles, key=lambda profile: profile['name'], reverse=True)
+
+
+def _profile_path(name):
+    if not PROFILE_NAME_RE.match(name):
+        raise Http404('No such profile')
+    path = profile_dir() / name
+    if not path.is_file():
+        raise Http404('No such profile')
+    return path
+
+
+def profile_list_view(request):
+    return render(request, 'admin/recipes/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': list_profiles(),
+        'max_files': settings.PROFILING_MAX_FILES,
+    })
+
+
+def profile_download_view(request, name):
+    return FileResponse(open(_profile_path(name), 'rb'), as_attachment=True, filename=name)
+
+
+def profile_stats_view(request, name):
+    """The top functions of a cProfile capture by cumulative time, as text."""
+    path = _profile_path(name)
+    if path.suffix != '.prof':
+        return FileResponse(open(path, 'rb'), content_type='text/html')
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(settings.PROFILING_STATS_LINES)
+    return render(request, 'admin/recipes/profile_stats.html', {
+        **admin.site.each_context(request),
+        'title': name,
+        'stats': out.getvalue(),
+    })
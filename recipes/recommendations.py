@@ -0,0 +1,148 @@
+"""
+Batch computation of the RelatedRecipe table.
+
+Similarity between two public recipes blends:
+  - cosine similarity of TF-IDF vectors over title, description and process
+    (title terms weighted up), and
+  - co-purchase cosine: how many users bought both recipes, normalised by
+    how many bought each.
+
+The similarity matrix is built a block of rows at a time as a sparse
+product, so memory stays bounded by the block size rather than the square
+of the catalogue. NumPy and SciPy are imported only inside the build so the
+web and Celery workers do not load them at boot.
+"""
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import PurchasedRecipe, Recipe, RelatedRecipe
+
+TOKEN_RE = re.compile(r'[a-z]{2,}')
+STOP_WORDS = frozenset(
+    'and the for with until into then add from this that are you your its will can '
+    'about over onto all each few more some such than too very was were has have'.split()
+)
+TITLE_WEIGHT = 3
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall((text or '').lower()) if token not in STOP_WORDS]
+
+
+def tfidf_matrix(documents):
+    """Rows are L2-normalised sublinear TF-IDF vectors, one per document (a Counter of terms)."""
+    import numpy as np
+    from scipy import sparse
+
+    vocabulary = {}
+    rows, cols, values = [], [], []
+    for row, counts in enumerate(documents):
+        for term, count in counts.items():
+            rows.append(row)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            values.append(1.0 + math.log(count))
+
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (rows, cols)),
+        shape=(len(documents), max(len(vocabulary), 1)),
+    )
+    document_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+    norms = np.sqrt(matrix.multiply(matrix).sum(axis=1)).A1
+    norms[norms == 0] = 1
+    return sparse.diags((1 / norms).astype(np.float32)) @ matrix
+
+
+def copurchase_matrix(recipe_index, purchases):
+    """Users x recipes matrix of purchases, columns L2-normalised, so M.T @ M is the co-purchase cosine."""
+    import numpy as np
+    from scipy import sparse
+
+    users = {}
+    rows, cols = [], []
+    for user_id, recipe_id in purchases:
+        col = recipe_index.get(recipe_id)
+        if col is None:
+            continue
+        rows.append(users.setdefault(user_id, len(users)))
+        cols.append(col)
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(max(len(users), 1), len(recipe_index)),
+    )
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    buyers = np.sqrt(np.asarray(matrix.sum(axis=0)).ravel())
+    buyers[buyers == 0] = 1
+    return matrix @ sparse.diags((1 / buyers).astype(np.float32))
+
+
+def top_related(text, purchased, top_k, copurchase_weight, block_size=512):
+    """
+    Yield (row, [(column, score), ...]) with each row's best `top_k` other
+    rows, best first. `text` and `purchased` are the matrices built above.
+    """
+    import numpy as np
+
+    text_t = text.T.tocsc()
+    purchased_t = purchased.T.tocsr()
+    for start in range(0, text.shape[0], block_size):
+        stop = min(start + block_size, text.shape[0])
+        block = (1 - copurchase_weight) * (text[start:stop] @ text_t)
+        block = block + copurchase_weight * (purchased_t[start:stop] @ purchased)
+        block = block.tocsr()
+        for offset in range(stop - start):
+            row = start + offset
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            columns = block.indices[begin:end]
+            scores = block.data[begin:end]
+            keep = (columns != row) & (scores > 0)
+            columns, scores = columns[keep], scores[keep]
+            if len(scores) > top_k:
+                best = np.argpartition(-scores, top_k)[:top_k]
+                columns, scores = columns[best], scores[best]
+            order = np.argsort(-scores, kind='stable')
+            yield row, [(int(columns[i]), float(scores[i])) for i in order]
+
+
+def rebuild_related_recipes(top_k=None, copurchase_weight=None):
+    """Recompute the RelatedRecipe table for every public recipe; returns the number of rows written."""
+    top_k = top_k or settings.RELATED_RECIPES_TOP_K
+    if copurchase_weight is None:
+        copurchase_weight = settings.RELATED_RECIPES_COPURCHASE_WEIGHT
+
+    recipe_ids = []
+    documents = []
+    public = Recipe.objects.filter(is_public=True).order_by('pk')
+    for pk, title, description, process in public.values_list(
+        'pk', 'title', 'content__description', 'content__process'
+    ).iterator(chunk_size=2000):
+        counts = Counter(tokenize(description))
+        counts.update(tokenize(process))
+        for term in tokenize(title):
+            counts[term] += TITLE_WEIGHT
+        recipe_ids.append(pk)
+        documents.append(counts)
+
+    rows = []
+    if recipe_ids:
+        recipe_index = {pk: i for i, pk in enumerate(recipe_ids)}
+        purchases = PurchasedRecipe.objects.values_list('user_id', 'recipe_id').iterator(chunk_size=5000)
+        text = tfidf_matrix(documents)
+        purchased = copurchase_matrix(recipe_index, purchases)
+        for row, related in top_related(text, purchased, top_k, copurchase_weight):
+            rows.extend(
+                RelatedRecipe(recipe_id=recipe_ids[row], related_id=recipe_ids[col], rank=rank, score=round(score, 4))
+                for rank, (col, score) in enumerate(related)
+            )
+
+    with transaction.atomic():
+        RelatedRecipe.objects.all().delete()
+        RelatedRecipe.objects.bulk_create(rows, batch_size=2000)
+    return len(rows)
@@ -0,0 +1,52 @@
+"""
+orjson-backed replacements for DRF's JSONRenderer and JSONParser.
+
+Compact output matches the stock renderer's. Serializer fields already turn
+`price`/`rating` into strings and datetimes into ISO 8601; Decimals, dates
+and datetimes that reach the renderer raw (e.g. aggregates put straight
+into a Response) are handed to DRF's own encoder. Requests for indented
+output, and data orjson cannot encode (integers beyond 64 bits), go to the
+stock renderer.
+
+Where they still differ: NaN and Infinity render as null, where the stock
+renderer refuses them under STRICT_JSON, and the parser reads integers
+beyond 64 bits as floats.
+"""
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # orjson only indents by two spaces; indented output is for people, so
+        # the stock renderer can take its time over it
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
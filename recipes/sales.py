@@ -0,0 +1,83 @@
+"""
+Per-creator daily sales rollups (CreatorDailySales).
+
+Orders add to the rollup of their recipe's author once the order commits;
+orders that reconciliation marks failed are taken back out. The update runs
+after commit so the rollup row is never locked for the length of a checkout
+transaction. `rebuild_sales_rollups` recomputes everything from the live
+and archived orders, e.g. if a worker died between the commit and the
+rollup update.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import CreatorDailySales, Order, OrderArchive
+
+# Orders placed before amounts were stored fall back to the recipe's price
+SALE_AMOUNT = Coalesce('amount', 'recipe__price')
+
+
+def _apply(deltas):
+    """deltas: {(creator_id, day, recipe_id): [units, revenue]}"""
+    for (creator_id, day, recipe_id), (units, revenue) in deltas.items():
+        key = {'creator_id': creator_id, 'day': day, 'recipe_id': recipe_id}
+        changes = {'units': F('units') + units, 'revenue': F('revenue') + revenue}
+        if CreatorDailySales.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                CreatorDailySales.objects.create(**key, units=units, revenue=revenue)
+        except IntegrityError:
+            # Created concurrently since the update above
+            CreatorDailySales.objects.filter(**key).update(**changes)
+
+
+def record_sales(sales, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) sales from the rollups after the current
+    transaction commits. `sales` holds (creator_id, recipe_id, created_at, amount) tuples.
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for creator_id, recipe_id, created_at, amount in sales:
+        delta = deltas[(creator_id, timezone.localdate(created_at), recipe_id)]
+        delta[0] += sign
+        delta[1] += sign * (amount or Decimal('0'))
+    if deltas:
+        transaction.on_commit(lambda: _apply(deltas))
+
+
+def record_orders(orders):
+    record_sales((order.recipe.created_by_id, order.recipe_id, order.created_at, order.amount) for order in orders)
+
+
+def _daily_totals(model):
+    return (
+        model.objects.exclude(status=Order.STATUS_FAILED)
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('recipe__created_by_id', 'recipe_id', 'day')
+        .annotate(units=Count('id'), revenue=Sum(SALE_AMOUNT))
+        .order_by()
+    )
+
+
+def rebuild_sales_rollups():
+    """Recompute every rollup row from live and archived orders; returns the number of rows."""
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for model in (Order, OrderArchive):
+        for row in _daily_totals(model).iterator(chunk_size=5000):
+            total = totals[(row['recipe__created_by_id'], row['day'], row['recipe_id'])]
+            total[0] += row['units']
+            total[1] += row['revenue'] or 0
+    rollups = [
+        CreatorDailySales(creator_id=creator_id, day=day, recipe_id=recipe_id, units=units, revenue=revenue)
+        for (creator_id, day, recipe_id), (units, revenue) in totals.items()
+    ]
+    with transaction.atomic():
+        CreatorDailySales.objects.all().delete()
+        CreatorDailySales.objects.bulk_create(rollups, batch_size=2000)
+    return len(rollups)
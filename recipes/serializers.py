@@ -1,6 +1,11 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from django.contrib.auth.models import User
-from .models import CartItem, Category, Order, PurchasedRecipe, Recipe, Subscription
+from django.db import transaction
+from .models import CartItem, Category, Order, OrderArchive, PaymentOrder, PurchasedRecipe, Recipe, RecipeContent, RelatedRecipe, Subscription
+from . import payments
+from .subscriptions import normalize_email
+from .tokens import CacheBlacklistRefreshToken
 
 
 #user registartion serializers
@@ -15,6 +20,10 @@ class RegisterSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
     
+class CacheBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    # Rotated refresh tokens are revoked in the cache (see recipes/tokens.py)
+    token_class = CacheBlacklistRefreshToken
+    
 #category and recipe serializers
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -22,25 +31,103 @@ class CategorySerializer(serializers.ModelSerializer):
         model = Category
         fields = '__all__'
         
+CONTENT_FIELDS = ('description', 'process')
+
+
+class CategoryField(serializers.PrimaryKeyRelatedField):
+    """Resolves categories from the map RecipeListSerializer preloads, if any."""
+
+    def to_internal_value(self, data):
+        categories = self.context.get('category_map')
+        if categories is None:
+            return super().to_internal_value(data)
+        try:
+            return categories[int(data)]
+        except (KeyError, TypeError, ValueError):
+            self.fail('does_not_exist', pk_value=data)
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        # One query for every category referenced by the batch instead of
+        # one lookup per item
+        if isinstance(data, list):
+            ids = set()
+            for item in data:
+                try:
+                    ids.add(int(item.get('category')))
+                except (AttributeError, TypeError, ValueError):
+                    pass
+            self.context['category_map'] = Category.objects.in_bulk(ids)
+        return super().to_internal_value(data)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     image = serializers.CharField(required=False)
+    category = CategoryField(queryset=Category.objects.all())
     created_by = serializers.ReadOnlyField(source='created_by.username')
     category_name = serializers.ReadOnlyField(source='category.name') 
-    process = serializers.CharField(allow_blank=True, required=False, default="")
+    # Stored in RecipeContent; only RecipeDetailSerializer returns them so
+    # list queries never have to join the large text columns.
+    description = serializers.CharField(write_only=True)
+    process = serializers.CharField(write_only=True, allow_blank=True, required=False, default="")
     
     class Meta:
         model = Recipe
         fields = '__all__'
-        read_only_fields = ['created_by', 'created_at']
+        read_only_fields = ['created_by', 'created_at', 'updated_at', 'deleted_at', 'change_seq']
+        list_serializer_class = RecipeListSerializer
+
+    @staticmethod
+    def pop_content(validated_data):
+        return {field: validated_data.pop(field) for field in CONTENT_FIELDS if field in validated_data}
         
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
-        return super().create(validated_data)
+        content = self.pop_content(validated_data)
+        with transaction.atomic():
+            recipe = super().create(validated_data)
+            RecipeContent.objects.create(recipe=recipe, **content)
+        return recipe
+
+    def update(self, instance, validated_data):
+        content = self.pop_content(validated_data)
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            if content:
+                recipe.content, _ = RecipeContent.objects.update_or_create(recipe=recipe, defaults=content)
+        return recipe
+
+
+class RecipeDetailSerializer(RecipeSerializer):
+    """RecipeSerializer plus the description/process text from RecipeContent."""
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        content = getattr(instance, 'content', None)
+        for field in CONTENT_FIELDS:
+            data[field] = getattr(content, field, '') if content else ''
+        return data
     
+class RelatedRecipeSerializer(serializers.ModelSerializer):
+    recipe = RecipeSerializer(source='related', read_only=True)
+
+    class Meta:
+        model = RelatedRecipe
+        fields = ['score', 'recipe']
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Subscription
         fields = ['email']
+
+    def validate_email(self, value):
+        # Stored lowercased, as bulk imports do; older rows may still be mixed case
+        email = normalize_email(value)
+        if Subscription.objects.filter(email__iexact=email).exists():
+            raise serializers.ValidationError('subscription with this email already exists.')
+        return email
         
 class PurchasedRecipeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -50,19 +137,55 @@ class PurchasedRecipeSerializer(serializers.ModelSerializer):
         
 class CartItemSerializer(serializers.ModelSerializer):
     recipe = RecipeSerializer(read_only=True)  # nested for GET
-    recipe_id = serializers.PrimaryKeyRelatedField(
-        queryset=Recipe.objects.all(),
-        source='recipe',
-        write_only=True
-    )
 
     class Meta:
         model = CartItem
-        fields = ['id', 'user', 'recipe', 'recipe_id']
+        fields = ['id', 'user', 'recipe']
         read_only_fields = ['user']
 
+
+class CartAddSerializer(serializers.Serializer):
+    # Existence is checked by CartItem.add in the same query for every id
+    recipe_id = serializers.IntegerField(min_value=1)
+
+
+class CartBatchAddSerializer(serializers.Serializer):
+    recipe_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100,
+    )
+
 class OrderSerializer(serializers.ModelSerializer):
+    razorpay_order_id = serializers.CharField(max_length=100)
+    razorpay_signature = serializers.CharField(write_only=True)
+
     class Meta:
         model = Order
-        fields = ['user', 'recipe', 'payment_id', 'created_at']
-        read_only_fields = ['user', 'created_at']
+        fields = ['user', 'recipe', 'payment_id', 'razorpay_order_id', 'razorpay_signature', 'amount', 'status', 'created_at']
+        read_only_fields = ['user', 'amount', 'status', 'created_at']
+
+    def validate(self, attrs):
+        # Checkout signs "<order_id>|<payment_id>" with our key secret, so a
+        # valid signature proves the payment belongs to the order we created.
+        signature = attrs.pop('razorpay_signature')
+        if not payments.verify_payment_signature(attrs['razorpay_order_id'], attrs['payment_id'], signature):
+            raise serializers.ValidationError('Payment signature verification failed')
+        # The signature says nothing about what was bought: the recipe must be
+        # one create_payment_order charged this user for under that order.
+        payment_order = self.get_payment_order(attrs['razorpay_order_id'])
+        if payment_order is None or attrs['recipe'].pk not in payment_order.recipe_ids:
+            raise serializers.ValidationError('Recipe is not part of this payment order')
+        # The unique constraint only sees live orders; archived ones were spent too
+        if OrderArchive.objects.filter(payment_id=attrs['payment_id'], recipe=attrs['recipe']).exists():
+            raise serializers.ValidationError('This payment has already been used for this recipe')
+        # What was charged, even if the recipe's price has changed since
+        attrs['amount'] = payment_order.price_of(attrs['recipe'])
+        return attrs
+
+    def get_payment_order(self, razorpay_order_id):
+        # Bulk checkouts validate every item against the same order; look it up once
+        cached = self.context.setdefault('payment_orders', {})
+        if razorpay_order_id not in cached:
+            cached[razorpay_order_id] = PaymentOrder.objects.filter(
+                razorpay_order_id=razorpay_order_id, user=self.context['request'].user,
+            ).first()
+        return cached[razorpay_order_id]
@@ -0,0 +1,51 @@
+"""
+Keep the public recipe snapshot in step with the rows it copies from.
+recipes.snapshot (and the serializers it renders with) is imported on first
+use so worker boot does not pay for it.
+"""
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Category, Recipe
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    # Raw saves (loaddata) count too. The refresh runs after the fixture
+    # commits, when the recipe's category, user and content are loaded.
+    from . import snapshot
+
+    snapshot.refresh_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    from . import snapshot
+
+    snapshot.refresh_where(category_id=instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Logins save last_login only; only a username change shows in the snapshot
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    from . import snapshot
+
+    snapshot.refresh_where(created_by_id=instance.pk)
+
+
+def build_snapshot(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    from django.db.migrations.executor import MigrationExecutor
+
+    # After migrating back, the snapshot table (or columns it copies) may not exist
+    executor = MigrationExecutor(connections[using])
+    if executor.migration_plan(executor.loader.graph.leaf_nodes(sender.label)):
+        return
+    from . import snapshot
+
+    snapshot.ensure_built()
@@ -0,0 +1,72 @@
+"""
+The public catalogue snapshot (PublicRecipeSnapshot) behind the anonymous
+recipe list.
+
+Rows are upserted or removed after each recipe change commits, fixture
+loads included (see recipes.signals). Category renames and username changes refresh the
+recipes that show them. Bulk writes that skip signals call
+`refresh_recipes` themselves. `rebuild_snapshot` runs from Celery beat to
+repair anything missed, e.g. `queryset.update()` calls.
+"""
+from django.db import transaction
+
+from .models import PublicRecipeSnapshot, Recipe
+from .serializers import RecipeSerializer
+
+SNAPSHOT_FIELDS = ['category', 'created_by', 'title', 'price', 'preparation_time', 'cooking_time', 'rating', 'data']
+REFRESH_CHUNK_SIZE = 500
+
+
+def _snapshot(recipe):
+    return PublicRecipeSnapshot(
+        recipe_id=recipe.pk, category_id=recipe.category_id, created_by_id=recipe.created_by_id,
+        title=recipe.title, price=recipe.price, preparation_time=recipe.preparation_time,
+        cooking_time=recipe.cooking_time, rating=recipe.rating, data=RecipeSerializer(recipe).data,
+    )
+
+
+def _public_recipes():
+    return Recipe.objects.filter(is_public=True).select_related('category', 'created_by')
+
+
+def refresh_recipes(recipe_ids):
+    """Bring the snapshot rows of `recipe_ids` up to date: upsert public recipes, drop the rest."""
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), REFRESH_CHUNK_SIZE):
+        chunk = recipe_ids[start:start + REFRESH_CHUNK_SIZE]
+        rows = [_snapshot(recipe) for recipe in _public_recipes().filter(pk__in=chunk)]
+        with transaction.atomic():
+            PublicRecipeSnapshot.objects.filter(recipe_id__in=chunk).exclude(
+                recipe_id__in=[row.recipe_id for row in rows]
+            ).delete()
+            PublicRecipeSnapshot.objects.bulk_create(
+                rows, update_conflicts=True, unique_fields=['recipe'], update_fields=SNAPSHOT_FIELDS,
+            )
+
+
+def refresh_on_commit(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: refresh_recipes(recipe_ids))
+
+
+def refresh_where(**filters):
+    """Refresh after commit every public recipe matching `filters`, e.g. category_id=3."""
+    transaction.on_commit(
+        lambda: refresh_recipes(_public_recipes().filter(**filters).values_list('pk', flat=True))
+    )
+
+
+def rebuild_snapshot():
+    """Rewrite the whole snapshot from Recipe; returns the number of rows."""
+    rows = [_snapshot(recipe) for recipe in _public_recipes().order_by('pk').iterator(chunk_size=2000)]
+    with transaction.atomic():
+        PublicRecipeSnapshot.objects.all().delete()
+        PublicRecipeSnapshot.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def ensure_built():
+    """Build the snapshot if it is empty but public recipes exist, e.g. right after it is introduced."""
+    if not PublicRecipeSnapshot.objects.exists() and Recipe.objects.filter(is_public=True).exists():
+        print(f"📸 Built public recipe snapshot: {rebuild_snapshot()} rows", flush=True)
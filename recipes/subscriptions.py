@@ -0,0 +1,118 @@
+"""
+Bulk newsletter imports shared by the staff endpoint and the
+`import_subscriptions` management command.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.functions import Lower
+
+from . import outbox
+from .models import Subscription
+from .tasks import send_subscription_welcome_emails
+
+
+def read_emails(lines, fmt):
+    """
+    Yield raw email values from an iterable of text lines.
+
+    `fmt` is 'csv' (an `email` header column, or else the first column) or
+    'ndjson' (one JSON string or {"email": ...} object per line).
+    """
+    if fmt == 'ndjson':
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield line
+                continue
+            yield item.get('email', '') if isinstance(item, dict) else str(item)
+        return
+
+    column = 0
+    for i, row in enumerate(csv.reader(lines)):
+        if not row:
+            continue
+        if i == 0:
+            header = [cell.strip().lower() for cell in row]
+            if 'email' in header:
+                column = header.index('email')
+                continue
+        if column < len(row):
+            yield row[column]
+
+
+def normalize_email(value):
+    return (value or '').strip().lower()
+
+
+def existing_emails(emails):
+    """The normalized `emails` already subscribed, however their rows are cased."""
+    return set(
+        Subscription.objects.annotate(normalized=Lower('email'))
+        .filter(normalized__in=emails).values_list('normalized', flat=True)
+    )
+
+
+def normalize_emails(values):
+    """Lowercase, validate and dedupe; returns (unique emails in order, invalid count)."""
+    seen = {}
+    invalid = 0
+    for value in values:
+        email = normalize_email(value)
+        if not email:
+            continue
+        try:
+            validate_email(email)
+        except ValidationError:
+            invalid += 1
+            continue
+        seen.setdefault(email, None)
+    return list(seen), invalid
+
+
+def bulk_subscribe(values, chunk_size=1000):
+    """
+    Insert new subscriptions in chunks and queue welcome mails for only the
+    rows that were actually inserted.
+    """
+    emails, invalid = normalize_emails(values)
+    batch_size = settings.WELCOME_EMAIL_BATCH_SIZE
+    created = 0
+
+    for start in range(0, len(emails), chunk_size):
+        chunk = emails[start:start + chunk_size]
+        existing = existing_emails(chunk)
+        new = [email for email in chunk if email not in existing]
+        if not new:
+            continue
+        with transaction.atomic():
+            last_pk = Subscription.objects.aggregate(last=Max('pk'))['last'] or 0
+            # ignore_conflicts skips rows committed concurrently since the lookup
+            Subscription.objects.bulk_create([Subscription(email=email) for email in new], ignore_conflicts=True)
+            # Welcome only the rows that are new since the lookup. A concurrent
+            # insert of the same email that commits while this one waits on it
+            # is still counted by both, so that address can be welcomed twice.
+            inserted = list(
+                Subscription.objects.filter(email__in=new, pk__gt=last_pk).order_by('pk').values_list('email', flat=True)
+            )
+            outbox.enqueue_many(
+                send_subscription_welcome_emails,
+                ([inserted[i:i + batch_size]] for i in range(0, len(inserted), batch_size)),
+            )
+        created += len(inserted)
+
+    return {
+        'unique': len(emails),
+        'created': created,
+        'existing': len(emails) - created,
+        'invalid': invalid,
+    }
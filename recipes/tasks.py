@@ -1,8 +1,16 @@
+from collections import defaultdict
+from datetime import timedelta
 from celery import shared_task
 from django.conf import settings
-from django.core.mail import send_mail, BadHeaderError
+from django.core.mail import EmailMessage, get_connection, send_mail, BadHeaderError
 from smtplib import SMTPException
 from django.utils.timezone import now
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from . import outbox
+from . import payments
+from . import sales
+from .models import Order, PaymentOrder, PurchasedRecipe
 
 @shared_task
 def notify_new_recipe(title, description, recipient_email):
@@ -20,6 +28,23 @@ def notify_new_recipe(title, description, recipient_email):
         return f'Failed to notify {recipient_email} about {title}'
     
 
+@shared_task
+def notify_new_recipes_digest(titles, recipient_email):
+    """One notification for a whole bulk import instead of one per recipe."""
+    try:
+        send_mail(
+            f'{len(titles)} New Recipes Added',
+            'New recipes:\n' + '\n'.join(f'- {title}' for title in titles),
+            'gpavankumar942@gmail.com',
+            [recipient_email],
+        )
+        return f'Notified {recipient_email} about {len(titles)} recipes'
+
+    except (BadHeaderError, SMTPException) as e:
+        print(f"Failed to send digest email to {recipient_email}. Error: {str(e)}")
+        return f'Failed to notify {recipient_email} about {len(titles)} recipes'
+
+
 @shared_task
 def send_subscription_welcome_email(email):
     try:
@@ -35,6 +60,26 @@ def send_subscription_welcome_email(email):
         return f'Failed to notify {email}'
 
 
+@shared_task
+def send_subscription_welcome_emails(emails):
+    """Welcome a batch of new subscribers over a single SMTP connection."""
+    messages = [
+        EmailMessage(
+            '🎉 Welcome to Foodie Heaven Newsletter!',
+            'Thanks for subscribing! Stay tuned for delicious recipes coming your way.',
+            'gpavankumar942@gmail.com',
+            [email],
+        )
+        for email in emails
+    ]
+    try:
+        sent = get_connection().send_messages(messages)
+        return f'Welcome emails sent to {sent} of {len(emails)} subscribers'
+    except (BadHeaderError, SMTPException) as e:
+        print(f"❌ Failed to send welcome email batch of {len(emails)}. Error: {str(e)}")
+        return f'Failed to notify {len(emails)} subscribers'
+
+
 @shared_task
 def send_purchase_email(user_email, recipe_title, price, payment_id):
     current_time = now()  # this is already timezone-aware if USE_TZ is True
@@ -56,3 +101,130 @@ def send_purchase_email(user_email, recipe_title, price, payment_id):
         [user_email],
         fail_silently=False,
     )
+
+
+@shared_task
+def reconcile_payments(lookback_hours=48):
+    """
+    Confirm pending orders against the gateway.
+
+    Payments are fetched in pages covering the pending window rather than one
+    call per order, then each Razorpay order is marked paid or failed as a
+    whole with one UPDATE per outcome.
+    """
+    pending = Order.objects.filter(
+        status=Order.STATUS_PENDING,
+        created_at__gte=now() - timedelta(hours=lookback_hours),
+    ).exclude(razorpay_order_id='')
+    if not pending.exists():
+        return 'No pending orders'
+    marked_paid, marked_failed = _settle(pending, now())
+    return f'Reconciled {marked_paid} paid and {marked_failed} failed orders'
+
+
+@shared_task
+def expire_stale_orders(lookback_hours=48):
+    """
+    Settle the pending orders reconcile_payments no longer looks at: one last
+    check against the gateway, after which an order whose payment is still
+    not captured is marked failed. Orders without a Razorpay order predate
+    payment verification and are left alone.
+    """
+    pending = Order.objects.filter(
+        status=Order.STATUS_PENDING,
+        created_at__lt=now() - timedelta(hours=lookback_hours),
+    ).exclude(razorpay_order_id='')
+    newest = pending.aggregate(newest=Max('created_at'))['newest']
+    if newest is None:
+        return 'No stale orders'
+    # Payments follow their order within the lookback, so the window can end there
+    marked_paid, marked_failed = _settle(pending, min(now(), newest + timedelta(hours=lookback_hours)), expire=True)
+    return f'Settled {marked_paid} paid and expired {marked_failed} stale orders'
+
+
+def _settle(pending, until, expire=False):
+    """
+    Mark the `pending` orders paid or failed by the payments made up to
+    `until`; returns (paid, failed) counts. Orders whose payment is not
+    visible stay pending, unless `expire` is set, which fails them.
+    """
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+
+    # Expected amount in paise and the payment id per Razorpay order. A
+    # payment is checked against what its order charged, not the orders
+    # claimed from it so far: recipe prices change and carts are claimed in part.
+    expected = defaultdict(lambda: {'amount': 0, 'payment_ids': set()})
+    for razorpay_order_id, payment_id, amount in pending.values_list('razorpay_order_id', 'payment_id', 'amount'):
+        expected[razorpay_order_id]['amount'] += int((amount or 0) * 100)
+        expected[razorpay_order_id]['payment_ids'].add(payment_id)
+    charged = PaymentOrder.objects.filter(razorpay_order_id__in=expected).values_list('razorpay_order_id', 'amount')
+    for razorpay_order_id, amount in charged:
+        expected[razorpay_order_id]['amount'] = int(amount * 100)
+
+    # Payments are created after the order, so the window starts at the oldest order
+    found = payments.fetch_payments(oldest.timestamp(), until.timestamp())
+
+    paid, failed = [], []
+    for razorpay_order_id, info in expected.items():
+        for payment_id in info['payment_ids']:
+            payment = found.get(payment_id)
+            if payment is None:
+                # Not visible yet: try again next run, unless this was the last check
+                if expire:
+                    failed.append(razorpay_order_id)
+            elif payment.get('order_id') != razorpay_order_id or payment['status'] == 'failed':
+                failed.append(razorpay_order_id)
+            elif payment['status'] == 'captured':
+                if payment['amount'] == info['amount']:
+                    paid.append(razorpay_order_id)
+                else:
+                    failed.append(razorpay_order_id)
+            elif expire:
+                failed.append(razorpay_order_id)  # never captured
+
+    marked_paid = pending.filter(razorpay_order_id__in=paid).update(status=Order.STATUS_PAID)
+    with transaction.atomic():
+        # Lock the rows so sales taken out of the rollups match the rows updated
+        failing = list(
+            pending.filter(razorpay_order_id__in=failed)
+            .select_for_update(of=('self',))
+            .annotate(sale_amount=sales.SALE_AMOUNT)
+            .values_list('pk', 'recipe__created_by_id', 'recipe_id', 'created_at', 'sale_amount', 'user_id', 'payment_id')
+        )
+        marked_failed = Order.objects.filter(
+            pk__in=[row[0] for row in failing], status=Order.STATUS_PENDING,
+        ).update(status=Order.STATUS_FAILED)
+        sales.record_sales((row[1:5] for row in failing), sign=-1)
+        # Take back the access granted at checkout by these payments
+        revoked = Q()
+        for _, _, recipe_id, _, _, user_id, payment_id in failing:
+            revoked |= Q(user_id=user_id, recipe_id=recipe_id, payment_id=payment_id)
+        if failing:
+            PurchasedRecipe.objects.filter(revoked).delete()
+    return marked_paid, marked_failed
+
+
+@shared_task
+def rebuild_related_recipes():
+    from .recommendations import rebuild_related_recipes as rebuild
+
+    return f'Stored {rebuild()} related recipe rows'
+
+
+@shared_task
+def relay_outbox():
+    return f'Relayed {outbox.relay_all()} outbox messages'
+
+
+@shared_task
+def archive_orders():
+    from .archive import archive_orders as archive
+
+    return f'Archived {archive()} orders'
+
+
+@shared_task
+def rebuild_public_snapshot():
+    from .snapshot import rebuild_snapshot
+
+    return f'Stored {rebuild_snapshot()} public recipe snapshot rows'
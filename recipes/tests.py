@@ -1,3 +1,959 @@
-from django.test import TestCase
+import functools
+import io
+import itertools
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from foodie_haven.celery import app as celery_app
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from . import jobs, outbox, payments, sales, tasks, throttling
+from .admin import EstimatedCountPaginator
+from .archive import archive_orders, has_ordered, order_history
+from .authentication import StatelessJWTAuthentication
+from .fake_razorpay import FakeRazorpayServer
+from .management.commands.profile_startup import TARGETS, measure
+from .management.commands.simulate_mail_flood import procfile_workers, routed_topology, simulate, single_queue_topology, workload
+from .models import CartItem, Category, JobCheckpoint, Order, OrderArchive, OutboxMessage, PaymentOrder, PublicRecipeSnapshot, PurchasedRecipe, Recipe, RecipeContent, Subscription
+from .recommendations import rebuild_related_recipes
+from .renderers import ORJSONParser, ORJSONRenderer
+from .subscriptions import bulk_subscribe
+from .tasks import send_purchase_email
+from .tokens import CacheBlacklistRefreshToken
+from .views import CustomTokenObtainPairSerializer
+
+
+def published(queue):
+    """Drain `queue` on the in-memory Celery broker; returns (task name, task id, priority) triples."""
+    messages = []
+    with celery_app.connection_for_read() as conn:
+        simple = conn.SimpleQueue(queue)
+        while True:
+            try:
+                message = simple.get(block=False)
+            except simple.Empty:
+                break
+            messages.append((message.headers['task'], message.headers['id'], message.properties.get('priority')))
+            message.ack()
+        simple.close()
+    return messages
+
+
+def create_checkout_data(target, payment_order=False):
+    """
+    Give `target` (a test class in setUpTestData, or a test in setUp) a
+    buyer, a chef, the chef's public recipe Dal at 100.00 in category Main
+    and, with `payment_order`, the buyer's PaymentOrder order_1 for Dal.
+    """
+    target.buyer = User.objects.create_user('buyer', email='buyer@example.com')
+    target.chef = User.objects.create_user('chef')
+    target.category = Category.objects.create(name='Main')
+    target.recipe = Recipe.objects.create(
+        title='Dal', category=target.category, created_by=target.chef, price=Decimal('100.00'), is_public=True,
+    )
+    if payment_order:
+        PaymentOrder.objects.create(
+            razorpay_order_id='order_1', user=target.buyer, recipe_ids=[target.recipe.pk], amount=target.recipe.price,
+        )
+
+
+@override_settings(RAZOR_KEY_SECRET='test-secret')
+class CheckoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+        cls.other = Recipe.objects.create(title='Kheer', category=cls.category, created_by=cls.chef, price=Decimal('500.00'), is_public=True)
+
+    def setUp(self):
+        cache.clear()  # throttle counters
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def pay_for(self, recipe, razorpay_order_id='order_1'):
+        with mock.patch.object(payments, 'create_order', return_value={'id': razorpay_order_id}):
+            return self.client.post('/api/create-payment-order/', {'recipe_id': recipe.pk}, format='json')
+
+    def place_order(self, recipe, razorpay_order_id='order_1', payment_id='pay_1'):
+        return self.client.post('/api/orders/', {
+            'recipe': recipe.pk,
+            'payment_id': payment_id,
+            'razorpay_order_id': razorpay_order_id,
+            'razorpay_signature': payments.payment_signature(razorpay_order_id, payment_id),
+        }, format='json')
+
+    def test_payment_order_records_what_it_pays_for(self):
+        response = self.pay_for(self.recipe)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['amount'], 10000)
+        payment_order = PaymentOrder.objects.get(razorpay_order_id='order_1')
+        self.assertEqual((payment_order.user, payment_order.recipe_ids), (self.buyer, [self.recipe.pk]))
+
+    def test_invalid_recipe_id_is_rejected(self):
+        response = self.client.post('/api/create-payment-order/', {'recipe_id': 'abc'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_payment_cannot_buy_another_recipe(self):
+        self.pay_for(self.recipe)
+        self.assertEqual(self.place_order(self.recipe).status_code, 201)
+        self.assertEqual(self.place_order(self.other).status_code, 400)
+        self.assertFalse(self.client.get(f'/api/has-purchased/{self.other.pk}/').json()['purchased'])
+
+    def test_payment_cannot_be_reused(self):
+        self.pay_for(self.recipe)
+        self.assertEqual(self.place_order(self.recipe).status_code, 201)
+        self.assertEqual(self.place_order(self.recipe).status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_order_of_another_user_is_rejected(self):
+        self.pay_for(self.recipe)
+        self.client.force_authenticate(User.objects.create_user('intruder'))
+        self.assertEqual(self.place_order(self.recipe).status_code, 400)
+
+    def test_failed_payment_revokes_the_purchase(self):
+        self.pay_for(self.recipe)
+        self.place_order(self.recipe)
+        self.assertTrue(PurchasedRecipe.objects.filter(user=self.buyer, recipe=self.recipe).exists())
+
+        found = {'pay_1': {'order_id': 'order_1', 'status': 'failed', 'amount': 10000}}
+        with mock.patch.object(payments, 'fetch_payments', return_value=found):
+            tasks.reconcile_payments()
+
+        self.assertEqual(Order.objects.get().status, Order.STATUS_FAILED)
+        self.assertFalse(PurchasedRecipe.objects.filter(user=self.buyer, recipe=self.recipe).exists())
+        self.assertFalse(self.client.get(f'/api/has-purchased/{self.recipe.pk}/').json()['purchased'])
+
+    def test_payment_is_reconciled_against_what_was_charged(self):
+        CartItem.add(self.buyer.pk, [self.recipe.pk, self.other.pk])
+        with mock.patch.object(payments, 'create_order', return_value={'id': 'order_1'}):
+            self.client.post('/api/create-payment-order/', {}, format='json')
+        Recipe.objects.filter(pk=self.recipe.pk).update(price=Decimal('150.00'))
+        # Only one of the two recipes paid for is claimed before reconciling
+        self.place_order(self.recipe)
+        self.assertEqual(Order.objects.get().amount, Decimal('100.00'))
+
+        found = {'pay_1': {'order_id': 'order_1', 'status': 'captured', 'amount': 60000}}
+        with mock.patch.object(payments, 'fetch_payments', return_value=found):
+            tasks.reconcile_payments()
+        self.assertEqual(Order.objects.get().status, Order.STATUS_PAID)
+
+    def test_archived_payment_cannot_be_replayed(self):
+        self.pay_for(self.recipe)
+        self.place_order(self.recipe)
+        Order.objects.update(status=Order.STATUS_PAID, created_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(archive_orders(older_than_days=1), 1)
+        self.assertEqual(self.place_order(self.recipe).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_stale_pending_orders_are_settled_before_archiving(self):
+        self.pay_for(self.recipe)
+        self.place_order(self.recipe)
+        Order.objects.update(created_at=timezone.now() - timedelta(days=3))
+        # Out of reconcile_payments' reach, and the gateway never saw the payment
+        with mock.patch.object(payments, 'fetch_payments', return_value={}) as fetch:
+            self.assertEqual(tasks.reconcile_payments(), 'No pending orders')
+            self.assertEqual(archive_orders(older_than_days=1), 1)
+        self.assertEqual(fetch.call_count, 1)
+        self.assertEqual(OrderArchive.objects.get().status, Order.STATUS_FAILED)
+        self.assertFalse(PurchasedRecipe.objects.exists())
+
+
+@override_settings(RAZOR_KEY_ID='rzp_test', RAZOR_KEY_SECRET='test-secret', RAZOR_RETRY_BACKOFF=0)
+class PaymentGatewayTests(TestCase):
+    """The payment calls over real HTTP against FakeRazorpayServer."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRazorpayServer().start()
+        cls.addClassCleanup(cls.server.stop)
+
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+
+    def setUp(self):
+        cache.clear()  # throttle counters
+        self.server.orders.clear()
+        self.server.payments.clear()
+        self.server.fail_next = 0
+        gateway = override_settings(RAZOR_API_BASE_URL=self.server.base_url)
+        gateway.enable()
+        self.addCleanup(gateway.disable)
+        payments.reset_client()
+        self.addCleanup(payments.reset_client)
+        self.breaker = self.enterContext(mock.patch.object(payments, 'breaker', payments.CircuitBreaker(2, 0.2)))
+
+    def list_payments(self):
+        return payments.call_gateway(payments.get_client().payment.all, {})
+
+    def test_retries_back_off_until_the_gateway_answers(self):
+        self.server.fail_next = 2
+        before = self.server.request_count
+        with override_settings(RAZOR_RETRY_BACKOFF=0.2), mock.patch.object(payments.time, 'sleep') as sleep:
+            self.assertEqual(self.list_payments()['items'], [])
+        self.assertEqual([c.args for c in sleep.call_args_list], [(0.2,), (0.4,)])
+        self.assertEqual(self.server.request_count - before, 3)
+
+        self.server.fail_next = settings.RAZOR_MAX_RETRIES + 1
+        with self.assertRaises(payments.PaymentGatewayUnavailable):
+            self.list_payments()
+
+    def test_breaker_opens_then_lets_a_trial_call_through(self):
+        self.server.fail_next = 2 * (settings.RAZOR_MAX_RETRIES + 1)
+        for _ in range(2):
+            with self.assertRaises(payments.PaymentGatewayUnavailable):
+                self.list_payments()
+        before = self.server.request_count
+        with self.assertRaisesMessage(payments.PaymentGatewayUnavailable, 'circuit is open'):
+            self.list_payments()
+        self.assertEqual(self.server.request_count, before)
+
+        # A failed trial re-opens the breaker at once
+        time.sleep(0.2)
+        self.server.fail_next = settings.RAZOR_MAX_RETRIES + 1
+        with self.assertRaises(payments.PaymentGatewayUnavailable):
+            self.list_payments()
+        with self.assertRaisesMessage(payments.PaymentGatewayUnavailable, 'circuit is open'):
+            self.list_payments()
+
+        # A successful one closes it
+        time.sleep(0.2)
+        self.list_payments()
+        self.list_payments()
+        self.assertEqual(self.server.request_count, before + settings.RAZOR_MAX_RETRIES + 1 + 2)
+
+    def test_half_open_breaker_lets_one_trial_through(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        time.sleep(0.2)
+        self.assertEqual([self.breaker.allow() for _ in range(3)], [True, False, False])
+        self.breaker.record_success()
+        self.assertTrue(self.breaker.allow())
+
+    def test_refused_order_is_a_bad_gateway_response(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        refused = (400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Invalid amount'}})
+        before = self.server.request_count
+        with mock.patch.object(self.server, 'handle', return_value=refused):
+            response = client.post('/api/create-payment-order/', {'recipe_id': self.recipe.pk}, format='json')
+        self.assertEqual(response.status_code, 502)
+        self.assertIn('error', response.json())
+        # Not retried, and the breaker does not count it
+        self.assertEqual(self.server.request_count - before, 1)
+        self.assertFalse(PaymentOrder.objects.exists())
+        self.assertTrue(self.breaker.allow())
+
+    def test_create_order_recovers_the_accepted_order_by_receipt(self):
+        handle = self.server.handle
+        lost = []
+
+        def lose_first_response(method, path, query, body):
+            status, response = handle(method, path, query, body)
+            if method == 'POST' and not lost:
+                # The gateway created the order but the reply never arrived
+                lost.append(response['id'])
+                return 500, {'error': {'code': 'SERVER_ERROR', 'description': 'Injected failure'}}
+            return status, response
+
+        with mock.patch.object(self.server, 'handle', lose_first_response):
+            order = payments.create_order(10000, receipt='receipt-1')
+        self.assertEqual(order['id'], lost[0])
+        self.assertEqual(len(self.server.orders), 1)
+
+    def test_payments_are_fetched_page_by_page(self):
+        order = payments.create_order(10000)
+        paid = {self.server.pay(order['id']) for _ in range(5)}
+        before = self.server.request_count
+        found = payments.fetch_payments(0, time.time() + 1, page_size=2)
+        self.assertEqual(set(found), paid)
+        self.assertEqual(self.server.request_count - before, 3)
+
+    def test_reconcile_payments_end_to_end(self):
+        kheer = Recipe.objects.create(title='Kheer', category=self.category, created_by=self.chef, price=Decimal('500.00'), is_public=True)
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+
+        for recipe, status in ((self.recipe, 'captured'), (kheer, 'failed')):
+            order_id = client.post('/api/create-payment-order/', {'recipe_id': recipe.pk}, format='json').json()['order_id']
+            payment_id = self.server.pay(order_id, status=status)
+            response = client.post('/api/orders/', {
+                'recipe': recipe.pk,
+                'payment_id': payment_id,
+                'razorpay_order_id': order_id,
+                'razorpay_signature': payments.payment_signature(order_id, payment_id),
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        tasks.reconcile_payments()
+        self.assertEqual(Order.objects.get(recipe=self.recipe).status, Order.STATUS_PAID)
+        self.assertEqual(Order.objects.get(recipe=kheer).status, Order.STATUS_FAILED)
+        self.assertEqual(list(PurchasedRecipe.objects.values_list('recipe', flat=True)), [self.recipe.pk])
+
+
+class RecipeListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.chef = User.objects.create_user('chef')
+        self.category = Category.objects.create(name='Main')
+        self.client = APIClient()
+        self.client.force_authenticate(self.chef)
+
+    def create_recipe(self, title):
+        return self.client.post('/api/recipes/', {
+            'title': title, 'category': self.category.pk, 'price': '10.00',
+            'description': 'A dish', 'process': 'Cook it',
+        }, format='json')
+
+    def test_invalidation_leaves_the_rest_of_the_cache_alone(self):
+        cache.set('idempotency:some-key', 'response')
+        self.assertEqual(self.client.get('/api/recipes/').json()['count'], 0)
+
+        self.assertEqual(self.create_recipe('Dal').status_code, 201)
+        self.assertEqual(RecipeContent.objects.get().process, 'Cook it')
+
+        self.assertEqual(self.client.get('/api/recipes/').json()['count'], 1)
+        self.assertEqual(cache.get('idempotency:some-key'), 'response')
+
+    def test_bulk_update_rejects_non_numeric_ids(self):
+        response = self.client.post('/api/recipes/', [{'id': 'abc', 'title': 'Dal'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecipeDeleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_deleted_recipe_leaves_carts(self):
+        CartItem.add(self.buyer.id, [self.recipe.pk])
+        self.client.force_authenticate(self.chef)
+        self.assertEqual(self.client.delete(f'/api/recipes/{self.recipe.pk}/').status_code, 204)
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/cart/count/').json()['count'], 0)
+        self.assertEqual(self.client.post('/api/create-payment-order/', {}, format='json').status_code, 400)
+
+    def test_admin_deletes_leave_tombstones(self):
+        other = Recipe.objects.create(title='Kheer', category=self.category, created_by=self.chef, price=Decimal('50.00'))
+        Order.objects.create(user=self.buyer, recipe=self.recipe, payment_id='pay_1', amount=self.recipe.price)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+        response = self.client.post(f'/admin/recipes/recipe/{self.recipe.pk}/delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post('/admin/recipes/recipe/', {
+            'action': 'delete_selected', '_selected_action': [other.pk], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        self.assertFalse(Recipe.objects.exists())
+        self.assertEqual(Recipe.all_objects.filter(deleted_at__isnull=False).count(), 2)
+        self.assertEqual(Order.objects.get().recipe_id, self.recipe.pk)
+        feed = self.client.get('/api/recipes/changes/').json()['results']
+        self.assertEqual(len(feed), 2)
+
+    def test_change_feed_clamps_limit(self):
+        for limit in ('0', '-1'):
+            response = self.client.get('/api/recipes/changes/', {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 1)
+
+
+class AdminChangelistTests(TestCase):
+    # Session, user, count and page rows, with every row's relations joined
+    # in; the recipe list also reads the categories for its sidebar filter
+    EXPECTED_QUERIES = {'recipe': 5, 'order': 4, 'purchasedrecipe': 4, 'cartitem': 4}
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.category = Category.objects.create(name='Main')
+        self.client.force_login(self.admin)
+
+    def add_rows(self, count):
+        start = Recipe.all_objects.count()
+        for n in range(start, start + count):
+            user = User.objects.create_user(f'user{n}')
+            recipe = Recipe.objects.create(title=f'Recipe {n}', category=self.category, created_by=user, price=Decimal('10.00'))
+            Order.objects.create(user=user, recipe=recipe, payment_id=f'pay_{n}', razorpay_order_id=f'order_{n}', amount=recipe.price)
+            PurchasedRecipe.objects.create(user=user, recipe=recipe)
+            CartItem.objects.create(user=user, recipe=recipe)
+
+    def changelist_queries(self, model):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(f'/admin/recipes/{model}/').status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        for rows in (2, 20):
+            self.add_rows(rows)
+            for model, expected in self.EXPECTED_QUERIES.items():
+                with self.subTest(model=model, rows=rows):
+                    self.assertEqual(self.changelist_queries(model), expected)
+
+    def test_unfiltered_recipe_list_uses_the_estimate(self):
+        self.assertTrue(EstimatedCountPaginator(Recipe.objects.order_by('pk'), 10).is_unfiltered())
+        self.assertFalse(EstimatedCountPaginator(Recipe.objects.filter(is_public=True).order_by('pk'), 10).is_unfiltered())
+
+
+class PublicSnapshotTests(TestCase):
+    def test_loaded_fixture_reaches_the_snapshot(self):
+        cache.clear()
+        chef = User.objects.create_user('chef')
+        category = Category.objects.create(name='Main')
+        recipe = Recipe.objects.create(title='Dal', category=category, created_by=chef, price=Decimal('100.00'), is_public=True)
+        fixture = serializers.serialize('json', [recipe])
+        Recipe.all_objects.filter(pk=recipe.pk).delete()
+
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            f.write(fixture)
+            f.flush()
+            # loaddata runs in a transaction the test case keeps open; run the refreshes it queues
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('loaddata', f.name, verbosity=0)
+
+        self.assertEqual(PublicRecipeSnapshot.objects.get().data['title'], 'Dal')
+        self.assertEqual(APIClient().get('/api/recipes/').json()['count'], 1)
+
+
+class EventStreamTests(TestCase):
+    def test_wsgi_request_without_events_process_is_refused(self):
+        self.assertEqual(self.client.get('/api/events/').status_code, 503)
+
+    @override_settings(EVENTS_URL='https://events.example.com/')
+    def test_wsgi_request_is_sent_to_the_events_process(self):
+        response = self.client.get('/api/events/?token=abc')
+        self.assertRedirects(response, 'https://events.example.com/api/events/?token=abc', fetch_redirect_response=False)
+
+
+@override_settings(RAZOR_KEY_SECRET='test-secret')
+class IdempotentCheckoutTests(TransactionTestCase):
+    CLIENTS = 8
+
+    def setUp(self):
+        cache.clear()
+        create_checkout_data(self, payment_order=True)
+
+    def test_concurrent_retries_place_one_order(self):
+        body = {
+            'recipe': self.recipe.pk,
+            'payment_id': 'pay_1',
+            'razorpay_order_id': 'order_1',
+            'razorpay_signature': payments.payment_signature('order_1', 'pay_1'),
+        }
+        start = threading.Barrier(self.CLIENTS)
+        record_orders = sales.record_orders
+
+        def slow_record_orders(orders):
+            time.sleep(0.2)  # keep the first request in flight while the others arrive
+            record_orders(orders)
+
+        def checkout():
+            client = APIClient()
+            client.force_authenticate(self.buyer)
+            start.wait()
+            try:
+                return client.post('/api/orders/', body, format='json', HTTP_IDEMPOTENCY_KEY='checkout-1')
+            finally:
+                connection.close()
+
+        with mock.patch.object(sales, 'record_orders', slow_record_orders):
+            with ThreadPoolExecutor(self.CLIENTS) as pool:
+                responses = list(pool.map(lambda _: checkout(), range(self.CLIENTS)))
+
+        self.assertEqual([response.status_code for response in responses], [201] * self.CLIENTS)
+        replayed = [response for response in responses if response.headers.get('Idempotent-Replayed') == 'true']
+        self.assertEqual(len(replayed), self.CLIENTS - 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(PurchasedRecipe.objects.count(), 1)
+
+
+@override_settings(RAZOR_KEY_SECRET='test-secret', CELERY_BROKER_URL='memory://', CELERY_RESULT_BACKEND='cache+memory://')
+class OutboxTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls, payment_order=True)
+
+    def setUp(self):
+        cache.clear()
+        celery_app.close()  # drop any broker pool made under the real settings
+        self.addCleanup(celery_app.close)
+        published('transactional')  # start from an empty queue
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def order(self, recipe_id):
+        return {
+            'recipe': recipe_id,
+            'payment_id': 'pay_1',
+            'razorpay_order_id': 'order_1',
+            'razorpay_signature': payments.payment_signature('order_1', 'pay_1'),
+        }
+
+    def test_rolled_back_request_publishes_nothing(self):
+        # The second order is invalid, so the whole checkout rolls back
+        response = self.client.post('/api/orders/', [self.order(self.recipe.pk), self.order(0)], format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.assertFalse(OutboxMessage.objects.exists())
+        self.assertEqual(outbox.relay(), 0)
+        self.assertEqual(published('transactional'), [])
+
+    def test_message_is_published_after_commit(self):
+        self.assertEqual(self.client.post('/api/orders/', self.order(self.recipe.pk), format='json').status_code, 201)
+        # The request itself only wrote the outbox row
+        self.assertEqual(published('transactional'), [])
+        message = OutboxMessage.objects.get()
+
+        self.assertEqual(outbox.relay(), 1)
+        self.assertEqual(published('transactional'), [('recipes.tasks.send_purchase_email', str(message.task_id), 0)])
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_message_is_sent_again_once_its_lease_expires(self):
+        message = outbox.enqueue(send_purchase_email, 'buyer@example.com', 'Dal', '100.00', 'pay_1')
+        expected = [('recipes.tasks.send_purchase_email', str(message.task_id), 0)]
+
+        # The relay dies after publishing, before it deletes the row
+        with mock.patch.object(QuerySet, 'delete', side_effect=RuntimeError('relay died')):
+            with self.assertRaises(RuntimeError):
+                outbox.relay()
+        self.assertEqual(published('transactional'), expected)
+
+        self.assertEqual(outbox.relay(), 0)  # still leased to the dead relay
+        later = timezone.now() + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS + 1)
+        with mock.patch.object(timezone, 'now', return_value=later):
+            self.assertEqual(outbox.relay(), 1)
+        self.assertEqual(published('transactional'), expected)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+
+class SubscriptionTests(TestCase):
+    def setUp(self):
+        cache.clear()  # throttle counters
+        self.client = APIClient()
+
+    def test_subscribe_normalizes_the_email(self):
+        Subscription.objects.create(email='Cook@Example.com')
+        self.assertEqual(self.client.post('/api/subscribe/', {'email': 'COOK@example.com'}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/subscribe/', {'email': ' New@Example.com '}, format='json').status_code, 201)
+        self.assertTrue(Subscription.objects.filter(email='new@example.com').exists())
+
+    def test_bulk_subscribe_welcomes_only_inserted_rows(self):
+        Subscription.objects.create(email='Cook@Example.com')
+        stats = bulk_subscribe(['cook@example.com', 'NEW@example.com', 'new@example.com', 'not-an-email'])
+        self.assertEqual(stats, {'unique': 2, 'created': 1, 'existing': 1, 'invalid': 1})
+        self.assertEqual(list(OutboxMessage.objects.values_list('args', flat=True)), [[['new@example.com']]])
+
+        # A row inserted after the lookup is not welcomed again
+        with mock.patch('recipes.subscriptions.existing_emails', return_value=set()):
+            stats = bulk_subscribe(['new@example.com'])
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+@override_settings(CELERY_BROKER_URL='memory://', CELERY_RESULT_BACKEND='cache+memory://')
+class CeleryRoutingTests(SimpleTestCase):
+    ROUTES = {
+        'recipes.tasks.send_purchase_email': ('transactional', 0),
+        'recipes.tasks.reconcile_payments': ('celery', 0),
+        'recipes.tasks.send_subscription_welcome_email': ('bulk', 3),
+        'recipes.tasks.notify_new_recipe': ('bulk', 6),
+        'recipes.tasks.send_subscription_welcome_emails': ('bulk', 9),
+    }
+
+    def setUp(self):
+        celery_app.close()
+        self.addCleanup(celery_app.close)
+        for queue in ('transactional', 'celery', 'bulk'):
+            published(queue)
+
+    def test_tasks_land_on_their_queue_with_their_priority(self):
+        # The outbox relay publishes by name with send_task, as here
+        for name, (queue, priority) in self.ROUTES.items():
+            with self.subTest(task=name):
+                result = celery_app.send_task(name)
+                self.assertEqual(published(queue), [(name, result.id, priority)])
+
+    def test_every_routed_queue_has_a_procfile_worker(self):
+        consumed = {queue for _, queues, _ in procfile_workers() for queue in queues}
+        for route in celery_app.conf.task_routes.values():
+            self.assertIn(route['queue'], consumed)
+
+    def test_receipts_are_not_delayed_by_a_bulk_flood(self):
+        arrivals = workload(flood=400, receipts=20, window=60)
+        routes, workers = routed_topology()
+
+        routed, _ = simulate(arrivals, routes, workers, send_seconds=0.5)
+        shared, _ = simulate(arrivals, *single_queue_topology(workers), send_seconds=0.5)
+
+        self.assertLess(max(routed), 1)
+        self.assertGreater(max(shared), 30)
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def test_workers_boot_without_deferred_modules(self):
+        # Each target is imported in a fresh interpreter. Timings vary with the
+        # machine, so only what gets imported is checked, not the budget.
+        for target in TARGETS:
+            with self.subTest(target=target):
+                _, modules = measure(target)
+                imported = {name for name, _, _ in modules}
+                self.assertTrue(imported)
+                self.assertFalse(imported & set(settings.STARTUP_DEFERRED_MODULES))
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    ENDPOINTS = ['/api/cart/count/', '/api/cart/', '/api/purchased-recipes/', '/api/has-purchased/1/']
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer', email='buyer@example.com')
+        self.authorization = f'Bearer {CustomTokenObtainPairSerializer.get_token(self.user).access_token}'
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.authorization)
+
+    def queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_claims_user_saves_the_user_query(self):
+        for path in self.ENDPOINTS:
+            with self.subTest(path=path):
+                stateless = self.queries(path)
+                with mock.patch.object(StatelessJWTAuthentication, 'get_user', JWTAuthentication.get_user):
+                    stock = self.queries(path)
+                self.assertEqual(len(stock) - len(stateless), 1)
+                self.assertFalse([sql for sql in stateless if 'FROM "auth_user"' in sql])
+
+    def test_deferred_columns_load_in_one_query(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=self.authorization)
+        with self.assertNumQueries(0):
+            user, _ = StatelessJWTAuthentication().authenticate(request)
+        with self.assertNumQueries(1):
+            self.assertEqual((user.email, user.date_joined), (self.user.email, self.user.date_joined))
+
+
+class TokenRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('buyer')
+        self.refresh = str(CustomTokenObtainPairSerializer.get_token(self.user))
+
+    def post_refresh(self, token):
+        return self.client.post('/api/token/refresh', {'refresh': token}, content_type='application/json')
+
+    def test_refresh_writes_nothing_to_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.post_refresh(self.refresh).status_code, 200)
+        # Only simplejwt's active-user check; the revocation lives in the cache
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['SELECT'])
+
+    def test_rotated_token_is_revoked_until_it_expires(self):
+        rotated = self.post_refresh(self.refresh).json()['refresh']
+
+        self.assertEqual(self.post_refresh(self.refresh).status_code, 401)
+        self.assertEqual(self.post_refresh(rotated).status_code, 200)
+        jti = CacheBlacklistRefreshToken(self.refresh, verify=False)['jti']
+        self.assertIsNotNone(cache.get(f'jwt_blacklist_{jti}'))
+
+
+class RefreshLoadTestCommandTests(TransactionTestCase):
+    # The command's client threads need its user committed
+    def test_load_test_command(self):
+        cache.clear()
+        out = io.StringIO()
+        call_command('bench_refresh', '--clients', '2', '--refreshes', '20', stdout=out)
+        self.assertIn('40 refreshes from 2 clients', out.getvalue())
+        self.assertIn('per refresh: 1 queries, 0 writes', out.getvalue())
+        self.assertFalse(User.objects.exists())
+
+
+class SlidingWindowThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_limit_holds_across_the_window_boundary(self):
+        hit = functools.partial(throttling.counter.hit, 'throttle_test', 10, 60)
+        self.assertEqual([hit(now=6000 + n)[0] for n in range(11)], [True] * 10 + [False])
+        # A quarter into the next window, three quarters of the last one (7 hits) still count
+        self.assertEqual([hit(now=6075)[0] for _ in range(4)], [True, True, True, False])
+
+    def test_rejected_requests_are_not_counted(self):
+        hit = functools.partial(throttling.counter.hit, 'throttle_test', 1, 60)
+        self.assertEqual([hit(now=6000)[0] for _ in range(5)], [True, False, False, False, False])
+        self.assertTrue(hit(now=6120)[0])
+
+    def test_overhead_benchmark(self):
+        out = io.StringIO()
+        call_command('bench_throttle', '--number', '50', stdout=out)
+        self.assertIn('no scope (other views)', out.getvalue())
+        self.assertIn('0 cache calls', out.getvalue())
+
+
+class RecipeContentSplitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.chef = User.objects.create_user('chef')
+        category = Category.objects.create(name='Main')
+        with self.captureOnCommitCallbacks(execute=True):  # public snapshot for anonymous lists
+            for n in range(3):
+                recipe = Recipe.objects.create(title=f'Recipe {n}', category=category, created_by=self.chef, is_public=True)
+                RecipeContent.objects.create(recipe=recipe, description='A dish', process='Cook it')
+        self.recipe = recipe
+
+    def content_queries(self, path, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [query['sql'] for query in queries if RecipeContent._meta.db_table in query['sql']]
+
+    def test_list_never_reads_the_text(self):
+        paths = ('/api/recipes/', f'/api/recipes/?search=Recipe&category={self.recipe.category_id}')
+        for user, path in itertools.product((None, self.chef), paths):
+            with self.subTest(user=user, path=path):
+                cache.clear()
+                data, queries = self.content_queries(path, user)
+                self.assertEqual(queries, [])
+                self.assertNotIn('description', data['results'][0])
+
+    def test_detail_joins_the_text(self):
+        data, queries = self.content_queries(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual((data['description'], data['process']), ('A dish', 'Cook it'))
+
+    def test_list_benchmark_leaves_no_rows(self):
+        out = io.StringIO()
+        call_command('bench_recipe_list', '--size', '50', '--repeat', '1', stdout=out)
+        self.assertIn('count public', out.getvalue())
+        self.assertEqual(Recipe.all_objects.count(), 3)
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    DATA = {
+        'title': 'Dal\u2028makhani é',
+        'price': Decimal('120.50'),
+        'created_at': timezone.make_aware(datetime(2026, 1, 2, 3, 4, 5)),
+        'counts': {1: 2},
+        'tags': [None, True, 1.25],
+    }
+
+    def test_output_matches_the_stock_renderer(self):
+        for media_type, data in (
+            ('application/json', self.DATA),
+            ('application/json; indent=4', self.DATA),
+            ('application/json', {'id': 2 ** 70}),
+        ):
+            with self.subTest(media_type=media_type):
+                self.assertEqual(
+                    ORJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type),
+                )
+
+    def test_nan_renders_as_null(self):
+        self.assertEqual(ORJSONRenderer().render({'rating': float('nan')}), b'{"rating":null}')
+
+    def test_parser_matches_the_stock_parser(self):
+        body = JSONRenderer().render({**self.DATA, 'price': '120.50', 'created_at': '2026-01-02T03:04:05Z'})
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for invalid in (b'{"a": 1', b'{"a": NaN}', b''):
+            with self.subTest(body=invalid), self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(invalid))
+
+
+class InlineExecutor:
+    """Stands in for ProcessPoolExecutor: runs each chunk at once, in this process and transaction."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class RunJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+        for n in range(4):
+            Recipe.objects.create(title=f'Recipe {n}', category=cls.category, created_by=cls.chef)
+
+    def run_job(self):
+        out = io.StringIO()
+        with mock.patch.object(jobs, 'ProcessPoolExecutor', InlineExecutor):
+            call_command('run_job', 'backfill_recipe_content', '--chunk-size', '2', stdout=out)
+        return out.getvalue()
+
+    def test_job_resumes_from_its_checkpoint(self):
+        self.assertIn('5 rows changed', self.run_job())
+        self.assertEqual(RecipeContent.objects.count(), 5)
+        last_pk = Recipe.all_objects.latest('pk').pk
+        self.assertEqual(JobCheckpoint.objects.get(name='backfill_recipe_content').last_pk, last_pk)
+        self.assertIn(f'Nothing to do after pk {last_pk}', self.run_job())
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+        for price, preparation_time in (('50.00', 10), ('300.00', 20), ('600.00', 45)):
+            Recipe.objects.create(
+                title='Dish', category=cls.category, created_by=cls.chef, price=Decimal(price),
+                preparation_time=preparation_time, is_public=True,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def test_each_facet_ignores_only_its_own_filter(self):
+        data = self.client.get('/api/recipes/facets/', {'min_price': '100', 'max_preparation_time': '30'}).json()
+        counts = {field: [bucket['count'] for bucket in buckets] for field, buckets in data['facets'].items()}
+        # Only the 300.00 dish passes both; Dal has no preparation time to compare
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(counts['price'], [1, 0, 1, 0])
+        self.assertEqual(counts['preparation_time'], [0, 1, 1, 0])
+
+    def test_non_numeric_bound_is_rejected(self):
+        self.assertEqual(self.client.get('/api/recipes/facets/', {'min_price': 'cheap'}).status_code, 400)
+
+
+class RelatedRecipeTests(TestCase):
+    def test_related_recipes_share_words(self):
+        create_checkout_data(self)
+        dishes = {}
+        for title, description in (
+            ('Paneer tikka', 'Grilled cottage cheese cubes with spices'),
+            ('Paneer butter masala', 'Cottage cheese simmered with butter and spices'),
+            ('Chocolate cake', 'Cocoa sponge with ganache'),
+        ):
+            dishes[title] = Recipe.objects.create(title=title, category=self.category, created_by=self.chef, is_public=True)
+            RecipeContent.objects.create(recipe=dishes[title], description=description)
+
+        self.assertGreater(rebuild_related_recipes(top_k=2), 0)
+        related = APIClient().get(f"/api/recipes/{dishes['Paneer tikka'].pk}/related/").json()
+        self.assertEqual([row['recipe']['title'] for row in related], ['Paneer butter masala'])
+
+
+@override_settings(RAZOR_KEY_SECRET='test-secret')
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls, payment_order=True)
+
+    def test_orders_roll_up_into_creator_sales(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/orders/', {
+                'recipe': self.recipe.pk,
+                'payment_id': 'pay_1',
+                'razorpay_order_id': 'order_1',
+                'razorpay_signature': payments.payment_signature('order_1', 'pay_1'),
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        client.force_authenticate(self.chef)
+        stats = client.get('/api/my-recipes/stats/').json()
+        self.assertEqual((stats['units'], stats['revenue']), (1, '100.00'))
+        self.assertEqual(stats['top_recipes'][0]['id'], self.recipe.pk)
+
+        # A rebuild from the orders agrees with the incremental rollups
+        sales.rebuild_sales_rollups()
+        self.assertEqual(client.get('/api/my-recipes/stats/').json()['revenue'], '100.00')
+
+
+class CartBatchAddTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+
+    def test_batch_add_skips_duplicates_and_reports_missing(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        for _ in range(2):
+            response = client.post('/api/cart/batch/', {'recipe_ids': [self.recipe.pk, self.recipe.pk, 999999]}, format='json')
+            self.assertEqual(response.json(), {'count': 1, 'missing': [999999]})
+        self.assertEqual(CartItem.objects.filter(user=self.buyer).count(), 1)
+
+
+class OrderArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+
+    def test_settled_old_orders_move_with_their_ids(self):
+        old = timezone.now() - timedelta(days=10)
+        moved = Order.objects.create(user=self.buyer, recipe=self.recipe, payment_id='pay_1', status=Order.STATUS_PAID)
+        recent = Order.objects.create(user=self.buyer, recipe=self.recipe, payment_id='pay_2', status=Order.STATUS_PAID)
+        Order.objects.filter(pk=moved.pk).update(created_at=old)
+
+        self.assertEqual(archive_orders(older_than_days=5, batch_size=1), 1)
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertEqual(OrderArchive.objects.get().pk, moved.pk)
+        history = order_history(full_history=True, user_id=self.buyer.pk)
+        self.assertEqual([order['id'] for order in history], [recent.pk, moved.pk])
+        self.assertTrue(has_ordered(self.buyer.pk, self.recipe.pk))
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_checkout_data(cls)
+        cls.staff = User.objects.create_user('staff', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(override_settings(PROFILING_ENABLED=True, PROFILING_DIR=Path(self.enterContext(tempfile.TemporaryDirectory()))))
+
+    def get(self, user, **params):
+        client = Client()
+        client.force_login(user)
+        return client.get('/api/recipes/', params)
+
+    def test_staff_request_is_profiled(self):
+        response = self.get(self.staff, profile='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue((settings.PROFILING_DIR / response['X-Profile-Id']).is_file())
+
+    def test_other_requests_are_not(self):
+        self.assertNotIn('X-Profile-Id', self.get(self.buyer, profile='1'))
+        self.assertNotIn('X-Profile-Id', self.get(self.staff))
+        with override_settings(PROFILING_ENABLED=False):
+            self.assertNotIn('X-Profile-Id', self.get(self.staff, profile='1'))
@@ -0,0 +1,110 @@
+"""
+Scoped DRF throttles backed by a sliding-window counter.
+
+DRF's stock throttles keep a list of request timestamps per client and
+rewrite it on every request. Here each client/scope pair costs two integer
+counters (current and previous fixed window) and the previous window is
+weighted by how much of it still overlaps the sliding window. On Redis the
+check-and-increment is a single Lua script call; other cache backends
+(locmem in development) fall back to the generic cache API.
+"""
+import math
+import threading
+import time
+
+from django.core.cache import cache, caches
+from rest_framework.throttling import ScopedRateThrottle
+
+SLIDING_WINDOW_LUA = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if math.floor(previous * tonumber(ARGV[3])) + current >= tonumber(ARGV[1]) then
+    return 0
+end
+if redis.call('INCR', KEYS[1]) == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[2] * 2)
+end
+return 1
+"""
+
+
+class SlidingWindowCounter:
+    def __init__(self):
+        self._script = None
+        self._lock = threading.Lock()
+
+    def _redis_script(self):
+        # Resolved once per process; False means the cache is not Redis
+        if self._script is None:
+            try:
+                from django_redis import get_redis_connection
+                from django_redis.cache import RedisCache
+            except ImportError:
+                self._script = False
+            else:
+                if isinstance(caches['default'], RedisCache):
+                    self._script = get_redis_connection('default').register_script(SLIDING_WINDOW_LUA)
+                else:
+                    self._script = False
+        return self._script or None
+
+    def hit(self, key, limit, window, now=None):
+        """
+        Count a request against `limit` per `window` seconds.
+
+        Returns (allowed, wait_seconds); rejected requests are not counted.
+        """
+        now = time.time() if now is None else now
+        index = int(now // window)
+        previous_weight = 1 - (now % window) / window
+        current_key = f'{key}_{index}'
+        previous_key = f'{key}_{index - 1}'
+        wait = window - (now % window)
+
+        script = self._redis_script()
+        if script is not None:
+            allowed = script(keys=[current_key, previous_key], args=[limit, window, previous_weight])
+            return bool(allowed), wait
+
+        with self._lock:
+            counts = cache.get_many([current_key, previous_key])
+            current = counts.get(current_key, 0)
+            previous = counts.get(previous_key, 0)
+            if math.floor(previous * previous_weight) + current >= limit:
+                return False, wait
+            if not cache.add(current_key, 1, timeout=window * 2):
+                cache.incr(current_key)
+        return True, wait
+
+
+counter = SlidingWindowCounter()
+
+
+class SlidingWindowScopedThrottle(ScopedRateThrottle):
+    """
+    Drop-in replacement for ScopedRateThrottle: views opt in with
+    `throttle_scope` (or a subclass sets `scope`), and rates come from
+    REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']. Authenticated users are keyed
+    by id, anonymous clients by IP.
+    """
+    scope = None
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, self.scope_attr, None) or type(self).scope
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        allowed, self.wait_seconds = counter.hit(
+            self.get_cache_key(request, view), self.num_requests, self.duration
+        )
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class PaymentThrottle(SlidingWindowScopedThrottle):
+    # Function-based views cannot set throttle_scope, so the scope lives here
+    scope = 'payment'
@@ -0,0 +1,41 @@
+"""
+Refresh token revocation backed by the cache instead of the database.
+
+simplejwt's token_blacklist app writes an OutstandingToken row on every login
+and refresh. Here a rotated refresh token is revoked by storing its `jti` in
+the cache with a TTL equal to the token's remaining lifetime, so lookups and
+revocations are a single O(1) cache call and expired entries purge themselves
+(natively in Redis, on access or cull in locmem).
+"""
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+def _blacklist_key(jti):
+    return f'jwt_blacklist_{jti}'
+
+
+class CacheBlacklistRefreshToken(RefreshToken):
+    def remaining_lifetime(self):
+        expires_at = datetime_from_epoch(self.payload['exp'])
+        return max(int((expires_at - aware_utcnow()).total_seconds()), 1)
+
+    def verify(self):
+        super().verify()
+        if cache.get(_blacklist_key(self.payload[api_settings.JTI_CLAIM])) is not None:
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        # cache.add is atomic, so when two refreshes race with the same token
+        # only one of them gets to rotate it.
+        added = cache.add(_blacklist_key(self.payload[api_settings.JTI_CLAIM]), 1, timeout=self.remaining_lifetime())
+        if not added:
+            raise TokenError('Token is blacklisted')
+
+    def outstand(self):
+        # Outstanding tokens are not tracked; only revoked jtis are stored.
+        # (The base implementation needs the token_blacklist tables.)
+        return None
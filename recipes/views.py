@@ -1,31 +1,74 @@
-from urllib import request
 from rest_framework import generics, permissions, filters
 from .permissions import IsOwnerOrReadOnly
-from .serializers import CartItemSerializer, OrderSerializer, PurchasedRecipeSerializer, RegisterSerializer, RecipeSerializer, CategorySerializer, SubscriptionSerializer
+from .serializers import CONTENT_FIELDS, CartAddSerializer, CartBatchAddSerializer, CartItemSerializer, OrderSerializer, PurchasedRecipeSerializer, RegisterSerializer, RecipeDetailSerializer, RelatedRecipeSerializer, RecipeSerializer, CategorySerializer, SubscriptionSerializer
 from django.core.cache import cache
-import razorpay
+from . import payments
+from .idempotency import idempotent
+from .throttling import PaymentThrottle
+from .subscriptions import bulk_subscribe, read_emails
+from . import events
+from . import facets
+from . import sales
+from . import snapshot
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.exceptions import TokenError
 from django.conf import settings
 from rest_framework.exceptions import NotFound
 from django.contrib.auth.models import User
-from .models import CartItem, Order, PurchasedRecipe, Recipe, Category, Subscription
+from .models import CartItem, ChangeSequence, CreatorDailySales, PaymentOrder, PublicRecipeSnapshot, PurchasedRecipe, Recipe, RecipeContent, RelatedRecipe, Category, Subscription
 from rest_framework.response import Response
 from rest_framework.pagination import LimitOffsetPagination
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.views import APIView
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated
-from .tasks import notify_new_recipe, send_subscription_welcome_email, send_purchase_email
+from .tasks import notify_new_recipe, notify_new_recipes_digest, send_subscription_welcome_email, send_purchase_email
+from . import archive
+from . import outbox
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.core.management import call_command
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Q 
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Q, Sum
+from datetime import timedelta
 import io
+import time
 
 
 # User registration view
 class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
+    throttle_scope = 'register'
+
+
+def recipe_list_generation(scope):
+    """
+    The current generation of a visibility scope's cached list pages. It is
+    part of every page key, so bumping it orphans the old pages, which then
+    expire on their own. The cache also holds idempotency keys, locks, the
+    token blacklist and throttle counters, so it is never cleared.
+    """
+    # Seeded from the clock: a generation evicted and re-created must not
+    # bring back pages cached under an earlier one
+    try:
+        return cache.get_or_set(f'recipe_list_gen_{scope}', time.time_ns, timeout=None)
+    except Exception as e:
+        print(f"⚠️ Cache unavailable for list generation: {e}", flush=True)
+        return 'none'
+
+
+def invalidate_recipe_lists(user_id):
+    """Drop a user's cached recipe list pages by moving their scope to a new generation."""
+    key = f'recipe_list_gen_{user_id}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
 
 
 # Pagination config
@@ -44,10 +87,36 @@ class SubscriptionCreateView(generics.CreateAPIView):
     queryset = Subscription.objects.all()
     serializer_class = SubscriptionSerializer
     permission_classes = [] 
+    throttle_scope = 'subscribe'
     
     def perform_create(self, serializer):
-        subscription = serializer.save()
-        send_subscription_welcome_email.delay(subscription.email)
+        with transaction.atomic():
+            subscription = serializer.save()
+            outbox.enqueue(send_subscription_welcome_email, subscription.email)
+
+class SubscriptionBulkCreateView(APIView):
+    """
+    Staff-only bulk subscribe. Accepts a multipart `file` upload or a raw
+    text/csv or application/x-ndjson body, streamed line by line.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        content_type = request.content_type or ''
+        if content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'error': 'Upload a file in the "file" field'}, status=400)
+            fmt = 'ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+            lines = upload
+        else:
+            fmt = 'ndjson' if 'ndjson' in content_type else 'csv'
+            lines = request._request
+
+        stats = bulk_subscribe(read_emails((line.decode('utf-8') for line in lines), fmt))
+        return Response(stats, status=201)
+
 
 class MyRecipeListView(generics.ListAPIView):
     serializer_class = RecipeSerializer
@@ -59,6 +128,51 @@ class MyRecipeListView(generics.ListAPIView):
     def get_queryset(self):
         return Recipe.objects.filter(created_by = self.request.user).select_related('category', 'created_by')
 
+
+class CreatorSalesStatsView(APIView):
+    """
+    GET /api/my-recipes/stats/?days=30 — sales of the caller's recipes over
+    the last `days` days: totals, one row per day, and the top recipes by
+    revenue. Read from the CreatorDailySales rollups, so the cost follows
+    days x recipes sold rather than the number of orders.
+    """
+    permission_classes = [IsAuthenticated]
+    default_days = 30
+    max_days = 365
+    top_recipes = 5
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', self.default_days))
+        except ValueError:
+            return Response({'error': 'Invalid days'}, status=400)
+        days = max(1, min(days, self.max_days))
+        since = timezone.localdate() - timedelta(days=days - 1)
+
+        rollups = CreatorDailySales.objects.filter(creator=request.user, day__gte=since)
+        totals = rollups.aggregate(units=Sum('units'), revenue=Sum('revenue'))
+        daily = rollups.values('day').annotate(units=Sum('units'), revenue=Sum('revenue')).order_by('day')
+        top = (
+            rollups.values('recipe_id', 'recipe__title')
+            .annotate(units=Sum('units'), revenue=Sum('revenue'))
+            .order_by('-revenue', 'recipe_id')[:self.top_recipes]
+        )
+
+        return Response({
+            'since': since,
+            'days': days,
+            'units': totals['units'] or 0,
+            'revenue': f"{totals['revenue'] or 0:.2f}",
+            'daily': [
+                {'day': row['day'], 'units': row['units'], 'revenue': f"{row['revenue']:.2f}"}
+                for row in daily
+            ],
+            'top_recipes': [
+                {'id': row['recipe_id'], 'title': row['recipe__title'], 'units': row['units'], 'revenue': f"{row['revenue']:.2f}"}
+                for row in top
+            ],
+        })
+
 # Recipe List/Create API — User-specific listing + optional category filter + Redis cache
 # class RecipeListCreateView(generics.ListCreateAPIView):
 #     serializer_class = RecipeSerializer
@@ -108,25 +222,20 @@ class MyRecipeListView(generics.ListAPIView):
 #     def perform_create(self, serializer):
 #         recipe = serializer.save(created_by=self.request.user)
 #         recipient_email = self.request.user.email  # grab email of recipe creator
-#         notify_new_recipe.delay(recipe.title, recipe.description, recipient_email)
+#         notify_new_recipe.delay(recipe.title, recipe.content.description, recipient_email)
 #         cache.delete_pattern(f'recipe_list_{self.request.user.id}_*')
 #         print(f"🆕 Cache cleared after recipe creation by {self.request.user.username}.", flush=True)
 
-class RecipeListCreateView(generics.ListCreateAPIView):
-    serializer_class = RecipeSerializer
-    permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # changed to allow unauthenticated GET
-    pagination_class = RecipePagination
+class RecipeFilterMixin:
+    """Visibility, category, title search and range filters shared by the list and facet views."""
     filter_backends = [filters.SearchFilter]
     search_fields = ['title']
 
-    def get_queryset(self):
+    def visible_recipes(self):
         """
         - Authenticated users: see their own recipes + public recipes
         - Unauthenticated users: see only public recipes
         """
-        print(f"🔍 User Authenticated: {self.request.user.is_authenticated}")
-        print(f"🔍 User: {self.request.user}")
-        
         user = self.request.user
         category_id = self.request.query_params.get('category')
 
@@ -139,6 +248,32 @@ class RecipeListCreateView(generics.ListCreateAPIView):
 
         if category_id:
             queryset = queryset.filter(category_id=category_id)
+        return queryset
+
+    def list_cache_key(self, suffix):
+        """Cache key within the user's visibility scope; invalidate_recipe_lists() drops the whole scope."""
+        params = self.request.query_params
+        user_id = self.request.user.id if self.request.user.is_authenticated else 'anonymous'
+        category_id = params.get('category')
+        search_query = params.get('search', '').strip() or 'none'
+        ranges = facets.cache_key_part(facets.parse_range_filters(params))
+        generation = recipe_list_generation(user_id)
+        return f'recipe_list_{user_id}_gen_{generation}_{category_id or "all"}_{suffix}_search_{search_query}_range_{ranges}'
+
+
+class RecipeListCreateView(RecipeFilterMixin, generics.ListCreateAPIView):
+    serializer_class = RecipeSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]  # changed to allow unauthenticated GET
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        print(f"🔍 User Authenticated: {self.request.user.is_authenticated}")
+        print(f"🔍 User: {self.request.user}")
+        
+        user = self.request.user
+        queryset = facets.apply_range_filters(
+            self.visible_recipes(), facets.parse_range_filters(self.request.query_params)
+        )
             
         print(f"User: {user} | Authenticated: {user.is_authenticated} | Recipes Count: {queryset.count()}")
 
@@ -146,13 +281,10 @@ class RecipeListCreateView(generics.ListCreateAPIView):
 
 
     def get(self, request, *args, **kwargs):
-        category_id = request.query_params.get('category')
-        user_id = request.user.id if request.user.is_authenticated else 'anonymous'
         limit = request.query_params.get('limit', 10)
         offset = request.query_params.get('offset', 0)
-        search_query = request.query_params.get('search', '').strip() or 'none'
 
-        cache_key = f'recipe_list_{user_id}_{category_id or "all"}_limit_{limit}_offset_{offset}_search_{search_query}'
+        cache_key = self.list_cache_key(f'limit_{limit}_offset_{offset}')
 
         try:
             cached_data = cache.get(cache_key)
@@ -162,7 +294,10 @@ class RecipeListCreateView(generics.ListCreateAPIView):
         except Exception as e:
             print(f"⚠️ Cache unavailable on GET: {e}", flush=True)
 
-        response = super().get(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            response = super().get(request, *args, **kwargs)
+        else:
+            response = self.list_public_snapshot()
 
         try:
             cache.set(cache_key, response.data, timeout=300)
@@ -172,38 +307,234 @@ class RecipeListCreateView(generics.ListCreateAPIView):
 
         return response
 
+    def list_public_snapshot(self):
+        """
+        The anonymous list, read from PublicRecipeSnapshot: the same filters
+        and pagination, but no Category/User joins and no serializer.
+        """
+        queryset = PublicRecipeSnapshot.objects.order_by('pk')
+        category_id = self.request.query_params.get('category')
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        queryset = facets.apply_range_filters(queryset, facets.parse_range_filters(self.request.query_params))
+        page = self.paginate_queryset(self.filter_queryset(queryset).values_list('data', flat=True))
+        return self.get_paginated_response(list(page))
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create_or_update(request)
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
-        recipe = serializer.save(created_by=self.request.user)
         recipient_email = self.request.user.email  # grab email of recipe creator
-        notify_new_recipe.delay(recipe.title, recipe.description, recipient_email)
-        cache.delete_pattern(f'recipe_list_{self.request.user.id}_*')
+        with transaction.atomic():
+            recipe = serializer.save(created_by=self.request.user)
+            outbox.enqueue(notify_new_recipe, recipe.title, recipe.content.description, recipient_email)
+        invalidate_recipe_lists(self.request.user.id)
+        if recipe.is_public:
+            transaction.on_commit(lambda: events.publish_public_recipes([recipe.id]))
         print(f"🆕 Cache cleared after recipe creation by {self.request.user.username}.", flush=True)
 
+    def bulk_create_or_update(self, request):
+        """
+        POST a list of recipes: items with an `id` update that recipe (it must
+        be yours), the rest are created. Everything is written in one
+        transaction, followed by one cache invalidation and one digest email.
+        """
+        user = request.user
+        items = request.data
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response({'error': f'At most {settings.RECIPE_BULK_MAX_ITEMS} recipes per request'}, status=400)
+
+        try:
+            update_ids = [int(item['id']) for item in items if isinstance(item, dict) and item.get('id')]
+        except (TypeError, ValueError):
+            return Response({'error': 'Recipe ids must be integers'}, status=400)
+        existing = Recipe.objects.filter(created_by=user).in_bulk(update_ids)
+        missing = [pk for pk in update_ids if pk not in existing]
+        if missing:
+            return Response({'error': 'Recipes not found or not yours', 'ids': missing}, status=404)
+
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        to_create, create_content = [], []
+        to_update, update_fields, update_content = [], set(), {}
+        for item, attrs in zip(items, serializer.validated_data):
+            content = RecipeSerializer.pop_content(attrs)
+            if item.get('id'):
+                recipe = existing[int(item['id'])]
+                for field, value in attrs.items():
+                    setattr(recipe, field, value)
+                update_fields.update(attrs)
+                to_update.append(recipe)
+                update_content[recipe.pk] = content
+            else:
+                to_create.append(Recipe(created_by=user, **attrs))
+                create_content.append(content)
+
+        with transaction.atomic():
+            # bulk_create/bulk_update skip Recipe.save(), so take the change
+            # feed positions for the whole batch here
+            first_seq = ChangeSequence.allocate(Recipe.CHANGE_SEQUENCE, len(to_create) + len(to_update))
+            for offset, recipe in enumerate(to_create + to_update):
+                recipe.change_seq = first_seq + offset
+            stamp = timezone.now()
+            for recipe in to_update:
+                recipe.updated_at = stamp
+            update_fields.update(['change_seq', 'updated_at'])
+
+            created = Recipe.objects.bulk_create(to_create)
+            RecipeContent.objects.bulk_create(
+                [RecipeContent(recipe=recipe, **content) for recipe, content in zip(created, create_content)]
+            )
+            if to_update:
+                Recipe.objects.bulk_update(to_update, sorted(update_fields), batch_size=500)
+                contents = RecipeContent.objects.in_bulk(list(update_content))
+                new_contents = []
+                for pk, values in update_content.items():
+                    row = contents.get(pk)
+                    if row is None:
+                        new_contents.append(RecipeContent(recipe_id=pk, **values))
+                        continue
+                    for field, value in values.items():
+                        setattr(row, field, value)
+                RecipeContent.objects.bulk_update(list(contents.values()), list(CONTENT_FIELDS), batch_size=500)
+                RecipeContent.objects.bulk_create(new_contents)
+            if created:
+                outbox.enqueue(notify_new_recipes_digest, [recipe.title for recipe in created], user.email)
+            # bulk_create/bulk_update send no post_save
+            snapshot.refresh_on_commit([recipe.pk for recipe in created + to_update])
+
+        invalidate_recipe_lists(user.id)
+        events.publish_public_recipes([recipe.id for recipe in created if recipe.is_public])
+        print(f"📦 Bulk saved {len(created)} new and {len(to_update)} updated recipes by {user.username}.", flush=True)
+
+        return Response(self.get_serializer(created + to_update, many=True).data, status=201)
+
+
+class RecipeFacetsView(RecipeFilterMixin, generics.GenericAPIView):
+    """
+    GET /api/recipes/facets/ — bucket counts for price, preparation_time,
+    cooking_time and rating, with the same category/search/range parameters
+    as the recipe list. Cached per visibility scope like the list pages.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        ranges = facets.parse_range_filters(request.query_params)
+        cache_key = self.list_cache_key('facets')
+
+        try:
+            cached_data = cache.get(cache_key)
+            if cached_data:
+                return Response(cached_data)
+        except Exception as e:
+            print(f"⚠️ Cache unavailable on GET: {e}", flush=True)
+
+        data = facets.facet_counts(self.filter_queryset(self.visible_recipes()), ranges)
+
+        try:
+            cache.set(cache_key, data, timeout=300)
+        except Exception as e:
+            print(f"⚠️ Failed to cache on SET: {e}", flush=True)
+
+        return Response(data)
+
+
+class RecipeChangesView(APIView):
+    """
+    Incremental sync feed: GET /api/recipes/changes/?since=<cursor>
+
+    Returns recipes changed after the cursor in commit order. Recipes that
+    were deleted or are no longer visible to the caller come back as
+    tombstones ({"id": ..., "deleted": true}). Pass the returned `next`
+    cursor on the following call; omit `since` for a full initial sync.
+    """
+    permission_classes = [permissions.AllowAny]
+    default_limit = 100
+    max_limit = 500
+
+    def get(self, request):
+        try:
+            seq, last_id = (int(part) for part in request.query_params.get('since', '0-0').split('-'))
+            limit = max(1, min(int(request.query_params.get('limit', self.default_limit)), self.max_limit))
+        except ValueError:
+            return Response({'error': 'Invalid since or limit'}, status=400)
+
+        changes = list(
+            Recipe.all_objects
+            .filter(Q(change_seq__gt=seq) | Q(change_seq=seq, id__gt=last_id))
+            .order_by('change_seq', 'id')
+            .select_related('category', 'created_by')[:limit]
+        )
+
+        user = request.user
+        serializer = RecipeSerializer(context={'request': request})
+        results = []
+        for recipe in changes:
+            visible = recipe.is_public or (user.is_authenticated and recipe.created_by_id == user.id)
+            if recipe.deleted_at is None and visible:
+                results.append(serializer.to_representation(recipe))
+            else:
+                results.append({'id': recipe.id, 'deleted': True, 'change_seq': recipe.change_seq})
+
+        next_cursor = f'{changes[-1].change_seq}-{changes[-1].id}' if changes else f'{seq}-{last_id}'
+        return Response({'results': results, 'next': next_cursor, 'has_more': len(changes) == limit})
+
 
 # Recipe detail/update/delete view
 class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Recipe.objects.all().select_related('category', 'created_by')
-    serializer_class = RecipeSerializer
+    # The only recipe view that joins the large text in RecipeContent
+    queryset = Recipe.objects.all().select_related('category', 'created_by', 'content')
+    serializer_class = RecipeDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
     def perform_update(self, serializer):
+        was_public = serializer.instance.is_public
         recipe = serializer.save()
-        cache.delete_pattern(f'recipe_list_{recipe.created_by.id}_*')
+        invalidate_recipe_lists(recipe.created_by.id)
+        if recipe.is_public and not was_public:
+            events.publish_public_recipes([recipe.id])
         print(f"📝 Cache cleared after recipe update by {recipe.created_by.username}.", flush=True)
 
     def perform_destroy(self, instance):
         created_by = instance.created_by.username
         user_id = instance.created_by.id
-        instance.delete()
-        cache.delete_pattern(f'recipe_list_{user_id}_*')
+        # Kept as a tombstone so incremental sync clients learn about the delete
+        instance.soft_delete()
+        invalidate_recipe_lists(user_id)
         print(f"❌ Cache cleared after recipe delete by {created_by}.", flush=True)
 
 
+class RelatedRecipeListView(generics.ListAPIView):
+    """
+    GET /api/recipes/<pk>/related/ — precomputed "you might also like"
+    recipes, best first, read in one query through the (recipe, rank) index.
+    Recipes made private or deleted since the last rebuild are skipped.
+    """
+    serializer_class = RelatedRecipeSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+
+    def get_queryset(self):
+        return RelatedRecipe.objects.filter(
+            recipe_id=self.kwargs['pk'],
+            recipe__is_public=True,
+            recipe__deleted_at__isnull=True,
+            related__is_public=True,
+            related__deleted_at__isnull=True,
+        ).select_related('related__category', 'related__created_by').order_by('rank')
+
+
 # Custom JWT token serializer to return user details
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
+        # Lets StatelessJWTAuthentication build request.user without a query
+        token['username'] = user.username
+        token['is_staff'] = user.is_staff
         return token
 
     def validate(self, attrs):
@@ -217,6 +548,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_scope = 'login'
 
 class CartListCreateView(generics.ListCreateAPIView):
     serializer_class = CartItemSerializer
@@ -225,10 +557,33 @@ class CartListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         return CartItem.objects.filter(user=self.request.user)
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
-        
-        
+    def create(self, request, *args, **kwargs):
+        serializer = CartAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_id = serializer.validated_data['recipe_id']
+        count, missing = CartItem.add(request.user.id, [recipe_id])
+        if missing:
+            return Response({'error': 'Recipe not found'}, status=404)
+        events.publish_cart_count(request.user.id, count)
+        return Response({'recipe_id': recipe_id, 'count': count}, status=201)
+
+
+class CartBatchAddView(APIView):
+    """
+    POST /api/cart/batch/ {"recipe_ids": [...]} — add up to 100 recipes in
+    one request, e.g. to restore a saved cart. Recipes already in the cart
+    are skipped; ids that do not exist come back in `missing`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = CartBatchAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        count, missing = CartItem.add(request.user.id, serializer.validated_data['recipe_ids'])
+        events.publish_cart_count(request.user.id, count)
+        return Response({'count': count, 'missing': missing})
+
+
 class CartItemDeleteView(generics.DestroyAPIView):
     queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
@@ -237,17 +592,25 @@ class CartItemDeleteView(generics.DestroyAPIView):
     def get_queryset(self):
         return self.queryset.filter(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        instance.delete()
+        events.publish_cart_count(self.request.user.id, self.request.user.cart_items.count())
+
 class ClearCartView(generics.DestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request):
         CartItem.objects.filter(user=request.user).delete()
+        events.publish_cart_count(request.user.id, 0)
         return Response({'message': 'Cart cleared'})
 
 class OrderCreateView(generics.CreateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    # Orders, purchases and their receipt mails commit together or not at all
+    @idempotent
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         user = request.user
         data = request.data
@@ -255,12 +618,14 @@ class OrderCreateView(generics.CreateAPIView):
         if isinstance(data, list):
             # Handle bulk order creation
             orders = []
+            context = self.get_serializer_context()
             for item in data:
                 item['user'] = user.id
-                serializer = self.get_serializer(data=item)
+                serializer = self.get_serializer(data=item, context=context)
                 serializer.is_valid(raise_exception=True)
                 order = serializer.save(user=user)
                 orders.append(serializer.data)
+                sales.record_orders([order])
 
                 # ✅ Create PurchasedRecipe
                 PurchasedRecipe.objects.get_or_create(
@@ -269,11 +634,12 @@ class OrderCreateView(generics.CreateAPIView):
                     defaults={'payment_id': order.payment_id}
                 )
 
-                # ✅ Send purchase email via Celery
-                send_purchase_email.delay(
+                # ✅ Queue purchase email (published by the outbox relay)
+                outbox.enqueue(
+                    send_purchase_email,
                     user.email,
                     order.recipe.title,
-                    str(order.recipe.price),
+                    str(order.amount),
                     order.payment_id
                 )
 
@@ -285,6 +651,7 @@ class OrderCreateView(generics.CreateAPIView):
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
             order = serializer.save(user=user)
+            sales.record_orders([order])
 
             # ✅ Create PurchasedRecipe
             PurchasedRecipe.objects.get_or_create(
@@ -293,11 +660,12 @@ class OrderCreateView(generics.CreateAPIView):
                 defaults={'payment_id': order.payment_id}
             )
 
-            # ✅ Send purchase email via Celery
-            send_purchase_email.delay(
+            # ✅ Queue purchase email (published by the outbox relay)
+            outbox.enqueue(
+                send_purchase_email,
                 user.email,
                 order.recipe.title,
-                str(order.recipe.price),
+                str(order.amount),
                 order.payment_id
             )
 
@@ -310,28 +678,53 @@ class PurchasedRecipesView(generics.ListAPIView):
 
     def get_queryset(self):
         recipe_ids = PurchasedRecipe.objects.filter(user=self.request.user).values_list('recipe_id', flat=True)
-        return Recipe.objects.filter(id__in=recipe_ids)
+        # Purchases stay visible after the author deletes the recipe
+        return Recipe.all_objects.filter(id__in=recipe_ids)
 
 
 # Check if a recipe is purchased
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def has_purchased_recipe(request, recipe_id):
-    purchased = Order.objects.filter(user=request.user, recipe_id=recipe_id).exists()
+    purchased = archive.has_ordered(request.user.id, recipe_id)
     return Response({'purchased': purchased})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([PaymentThrottle])
 def create_payment_order(request):
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-    amount = request.data.get('amount')
-
-    order = client.order.create({
-        "amount": int(amount) * 100,
-        "currency": "INR",
-        "payment_capture": 1
-    })
-    return Response({'order_id': order['id']})
+    # The amount is always computed here, never taken from the client: either
+    # the single recipe being bought or the whole cart in one aggregate query.
+    recipe_id = request.data.get('recipe_id')
+    if recipe_id:
+        try:
+            recipe_id = int(recipe_id)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid recipe_id'}, status=400)
+        prices = list(Recipe.objects.filter(pk=recipe_id).values_list('pk', 'price'))
+        if not prices:
+            return Response({'error': 'Recipe not found'}, status=404)
+    else:
+        prices = list(CartItem.objects.filter(user=request.user).values_list('recipe_id', 'recipe__price'))
+        if not prices:
+            return Response({'error': 'Cart is empty'}, status=400)
+    total = sum(price for _, price in prices)
+
+    amount = int(total * 100)
+    try:
+        order = payments.create_order(amount, notes={'user_id': request.user.id})
+    except payments.PaymentGatewayUnavailable as e:
+        print(f"⚠️ Payment order creation failed: {e}", flush=True)
+        return Response({'error': 'Payment gateway unavailable, please retry shortly'}, status=503)
+    except payments.PaymentGatewayError as e:
+        print(f"⚠️ Payment order rejected by the gateway: {e}", flush=True)
+        return Response({'error': 'Payment gateway rejected the order'}, status=502)
+    # Remember what this order pays for; OrderCreateView accepts nothing else
+    PaymentOrder.objects.create(
+        razorpay_order_id=order['id'], user=request.user,
+        recipe_ids=[pk for pk, _ in prices], prices={str(pk): str(price) for pk, price in prices}, amount=total,
+    )
+    return Response({'order_id': order['id'], 'amount': amount, 'currency': 'INR', 'key_id': settings.RAZOR_KEY_ID})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -339,6 +732,33 @@ def cart_count(request):
     count = request.user.cart_items.count()
     return Response({'count': count})
 
+async def event_stream(request):
+    """
+    Server-sent events: live cart count (when authenticated) and ids of newly
+    public recipes. EventSource cannot set headers, so the access token may
+    be passed as ?token=. Needs an ASGI server; under WSGI each open stream
+    would pin a worker, so the request is sent on to the `events` process.
+    """
+    if not isinstance(request, ASGIRequest):
+        if settings.EVENTS_URL:
+            return HttpResponseRedirect(settings.EVENTS_URL.rstrip('/') + request.get_full_path())
+        return JsonResponse({'error': 'Event stream requires the ASGI server'}, status=503)
+
+    channels = [events.PUBLIC_RECIPES_CHANNEL]
+    header = request.headers.get('Authorization', '')
+    token = request.GET.get('token') or (header[7:] if header.startswith('Bearer ') else None)
+    if token:
+        try:
+            user_id = AccessToken(token)['user_id']
+        except (TokenError, KeyError):
+            return JsonResponse({'error': 'Invalid token'}, status=401)
+        channels.append(events.cart_channel(user_id))
+
+    response = StreamingHttpResponse(events.stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def load_data_view(request):
     if request.method == 'GET':
         out = io.StringIO()